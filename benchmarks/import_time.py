@@ -0,0 +1,63 @@
+"""
+Cold start cost of `import toasted.toasted`.
+
+Every sample runs in a fresh interpreter so nothing is cached in sys.modules.
+The 'eager' scenario also loads the three winsdk namespaces right after the
+import, which is what the module used to do at import time (Windows only).
+
+Usage:  python benchmarks/import_time.py [samples]
+"""
+
+import os
+import sys
+import statistics
+import subprocess
+
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+LAZY = """
+import sys, time
+start = time.perf_counter()
+import toasted.toasted
+elapsed = time.perf_counter() - start
+print(elapsed, sum(name.startswith("winsdk") for name in sys.modules))
+"""
+
+EAGER = """
+import sys, time
+start = time.perf_counter()
+import toasted.toasted as tt
+tt.wx.load(); tt.wf.load(); tt.wn.load()
+elapsed = time.perf_counter() - start
+print(elapsed, sum(name.startswith("winsdk") for name in sys.modules))
+"""
+
+
+def sample(code: str):
+    env = dict(os.environ, PYTHONPATH=SRC, PYTHONDONTWRITEBYTECODE="")
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    elapsed, modules = result.stdout.split()
+    return float(elapsed), int(modules)
+
+
+def measure(name: str, code: str, samples: int):
+    runs = [sample(code) for _ in range(samples)]
+    if None in runs:
+        print(f"{name:<6} unavailable (winsdk not installed)")
+        return None
+    times = [elapsed for elapsed, _ in runs]
+    median = statistics.median(times) * 1000
+    print(f"{name:<6} median {median:8.2f} ms   min {min(times) * 1000:8.2f} ms   "
+          f"winsdk modules loaded: {runs[0][1]}")
+    return median
+
+
+if __name__ == "__main__":
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    lazy = measure("lazy", LAZY, samples)
+    eager = measure("eager", EAGER, samples)
+    if lazy is not None and eager is not None:
+        print(f"saved  {eager - lazy:8.2f} ms per process start")
@@ -0,0 +1,70 @@
+"""
+Memory of 100k queued toasts: full Toast objects against compact Draft ones.
+
+Every toast is built with the same builders, called on Toast (Element nodes)
+or on Draft (Node objects), and kept in a list as a queue would. The build
+time of one toast is reported too: the memory saving should not cost speed.
+The drafts are then turned into the xml string and into the Element tree,
+as happens at send time.
+
+Usage:  python benchmarks/memory.py [count]
+"""
+
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from toasted.toasted import Draft, Toast, Tree
+
+
+def content(kind, number: int):
+    # a reminder like toast, personalized so that no text is shared
+    root = kind.Section("toast")
+    selection = kind.SelectionBox("5 minutes", "1 hour", name="snoozeTime", label="postpone in:")
+    binding = kind.Binding(kind.Text(f"Reminder #{number}"),
+                           kind.Group(kind.Subgroup(kind.Text(f"Task {number} overdue", style="subtitle"),
+                                                    kind.Text("Don't forget about it.", style="body"))))
+    root.extend([kind.Visual(), kind.Actions(selection, kind.ButtonPospone(duration=selection),
+                                             kind.ButtonDismiss())])
+    root[0].append(binding)
+    return root
+
+
+def toast(number: int):
+    return Toast(Tree(content(Toast, number)))
+
+
+def draft(number: int):
+    return Draft(content(Draft, number))
+
+
+def measure(name: str, make, count: int):
+    # timed apart, tracemalloc slows the allocations down
+    build = min(timeit.repeat(lambda: make(0), number=1000, repeat=3)) / 1000
+    gc.collect()
+    tracemalloc.start()
+    queue = [make(number) for number in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<8} {size / 2 ** 20:8.1f} MiB   {size / count:8.0f} B/toast   built in {build * 1e6:6.1f} us")
+    return queue, size, build
+
+
+def convert(drafts: list):
+    sample = drafts[:10_000]
+    to_string = min(timeit.repeat(lambda: [str(draft) for draft in sample], number=1, repeat=3)) / len(sample)
+    to_tree = min(timeit.repeat(lambda: [draft.root.element() for draft in sample], number=1, repeat=3)) / len(sample)
+    print(f"send time: xml string {to_string * 1e6:.1f} us   Element tree {to_tree * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    toasts, full, slow = measure("Toast", toast, count)
+    del toasts
+    drafts, compact, fast = measure("Draft", draft, count)
+    print(f"x{full / compact:.1f} less memory, x{fast / slow:.2f} the build time of a Toast")
+    convert(drafts)
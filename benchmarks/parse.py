@@ -0,0 +1,68 @@
+"""
+Element.fromstring: single pass parser against the former recursive one.
+
+The former implementation parsed the string, then serialized and re-parsed
+every child recursively, so its cost grows with depth * size.
+Incremental parsing (Element.iterparse) of a large file is measured too.
+
+Usage:  python benchmarks/parse.py
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+from xml.etree import ElementTree as xe
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from toasted.toasted import Element
+
+
+def recursive_fromstring(string):
+    # the implementation replaced by the single pass parser
+    raw = xe.fromstring(string)
+    subelements = list(raw.iterfind("./"))
+    parent = Element(raw.tag, text=raw.text, **raw.attrib)
+    for sub in subelements:
+        parent.append(recursive_fromstring(xe.tostring(sub)))
+    return parent
+
+
+def deep(depth: int) -> str:
+    return "<group hint-weight='1'>" * depth + "<text>deep</text>" + "</group>" * depth
+
+
+def wide(width: int) -> str:
+    texts = "".join(f"<text hint-style='body' id='{i}'>line {i}</text>" for i in range(width))
+    return f"<toast><visual><binding template='ToastGeneric'>{texts}</binding></visual></toast>"
+
+
+def compare(name: str, string: str, number: int):
+    old = min(timeit.repeat(lambda: recursive_fromstring(string), number=number, repeat=3)) / number
+    new = min(timeit.repeat(lambda: Element.fromstring(string), number=number, repeat=3)) / number
+    print(f"{name:<12} recursive {old * 1e6:10.1f} us   single pass {new * 1e6:10.1f} us   x{old / new:6.1f}")
+
+
+def stream(width: int):
+    with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False) as file:
+        file.write(wide(width))
+    try:
+        start = timeit.default_timer()
+        count = 0
+        for _, element in Element.iterparse(file.name):
+            if element.tag == "text":
+                element.clear()
+            count += 1
+        elapsed = timeit.default_timer() - start
+    finally:
+        os.remove(file.name)
+    print(f"{'iterparse':<12} {count} elements in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    for depth in (10, 50, 200):
+        compare(f"deep {depth}", deep(depth), 20)
+    for width in (10, 100, 1000):
+        compare(f"wide {width}", wide(width), 20)
+    stream(100_000)
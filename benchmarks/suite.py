@@ -0,0 +1,200 @@
+"""
+Hot paths of building, serializing and sending a toast, against a stored baseline.
+
+Every case reports operations per second (best of 7 runs), the peak memory
+allocated while one operation runs, and the memory blocks each operation
+leaves allocated (over 100 runs, so about 0 unless something accumulates).
+Speed is gated as the cost relative to a reference operation of the standard
+library (parsing the reminder with plain xml.etree), timed in turns with the
+case: the ratio carries over between machines, absolute timings do not.
+Results are compared with benchmarks/baseline.json: a case slower or hungrier
+than the baseline beyond the tolerance is a regression and the exit code is 1.
+Sending goes through the RecordingBackend, so it runs on any platform.
+
+Usage:  python benchmarks/suite.py                  compare with the baseline
+        python benchmarks/suite.py --save           store the results as the baseline
+        python benchmarks/suite.py -k wxml -k send  run only the matching cases
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from xml.etree import ElementTree
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from toasted.toasted import Backend, Element, RecordedDocument, RecordingBackend, Toast, Tree
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+REPEAT = 7
+
+
+def reference():
+    """
+    The unit of the relative costs: plain xml.etree parsing, which toasted never changes
+    """
+    string = str(Toast.Reminder())
+    return lambda: ElementTree.fromstring(string)
+
+
+def cases(folder: str) -> dict:
+    """
+    Name -> callable, every callable is one operation
+    """
+    backend = RecordingBackend()
+    Backend.use(backend)
+    reminder = Toast.Reminder()
+    string = str(reminder)
+    element = reminder.xml.root
+    document = RecordedDocument(string)
+    path = os.path.join(folder, "reminder.xml")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(string)
+    tree = Tree(string)
+
+    # Wxml after an edit: the document is serialized, validated and loaded again
+    edited = Toast.Reminder()
+    texts = [edited.xml.find("./visual/binding/text")]
+
+    def wxml_edited():
+        texts[0].text = "changed" if texts[0].text != "changed" else "again"
+        edited.Wxml
+        backend.reset()
+
+    def send():
+        reminder.send()
+        backend.reset()
+
+    return {
+        "fromstring": lambda: Element.fromstring(string),
+        "copy": element.copy,
+        "clone": reminder.clone,
+        "tree element": lambda: Tree(element),
+        "tree string": lambda: Tree(string),
+        "tree file": lambda: Tree(path),
+        "tree winrt": lambda: Tree(document),
+        "tree empty": lambda: Tree(),
+        "correct": lambda: Toast.correct(tree),
+        "str": lambda: str(reminder),
+        "repr": lambda: repr(reminder),
+        "wxml cached": lambda: reminder.Wxml,
+        "wxml edited": wxml_edited,
+        "reminder": Toast.Reminder,
+        "incoming call": Toast.IncomingCall,
+        "send": send,
+    }
+
+
+def run(operation, unit) -> dict:
+    timer, scale = timeit.Timer(operation), timeit.Timer(unit)
+    number, _ = timer.autorange()
+    units, _ = scale.autorange()
+    # in turns, so a slower moment of the machine weighs on both
+    best, base = float("inf"), float("inf")
+    for _ in range(REPEAT):
+        best = min(best, timer.timeit(number) / number)
+        base = min(base, scale.timeit(units) / units)
+    # memory: peak while one operation runs
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # blocks left allocated by each operation, caches are warm by now
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    for _ in range(100):
+        operation()
+    gc.collect()
+    kept = (sys.getallocatedblocks() - blocks) / 100
+    return {"ops": 1 / best, "cost": best / base, "peak": peak - start, "blocks": kept}
+
+
+def changes(result: dict, base: dict) -> tuple[float, float]:
+    """
+    Relative change of speed (from the relative costs) and peak memory against the baseline
+    """
+    speed = base["cost"] / result["cost"] - 1
+    memory = result["peak"] / base["peak"] - 1 if base["peak"] else 0.0
+    return speed, memory
+
+
+def regressed(result: dict, base: dict, tolerance: float) -> bool:
+    if base is None:
+        return False
+    speed, memory = changes(result, base)
+    return speed < -tolerance or memory > tolerance
+
+
+def measure(operation, unit, base: dict, tolerance: float) -> dict:
+    """
+    Run the case; a case that looks regressed runs once more, keeping the best
+    figures, so a busy moment of the machine is not taken for a regression
+    """
+    result = run(operation, unit)
+    if regressed(result, base, tolerance):
+        again = run(operation, unit)
+        result = {"ops": max(result["ops"], again["ops"]), "cost": min(result["cost"], again["cost"]),
+                  "peak": min(result["peak"], again["peak"]), "blocks": min(result["blocks"], again["blocks"])}
+    return result
+
+
+def report(name: str, result: dict, base: dict, tolerance: float):
+    line = (f"{name:<14} {result['ops']:12,.0f} ops/s {result['cost']:9.4f} x ref "
+            f"{result['peak']:10,} B peak {result['blocks']:6.1f} blocks")
+    if base is None:
+        print(line + "   (no baseline)")
+        return
+    speed, memory = changes(result, base)
+    flags = " ".join(flag for flag, bad in (("SLOWER", speed < -tolerance), ("MEMORY", memory > tolerance)) if bad)
+    print(f"{line}   speed {speed:+7.1%}  memory {memory:+7.1%}  {flags}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline json file")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative change")
+    parser.add_argument("-k", dest="only", action="append", help="run the cases containing this text")
+    arguments = parser.parse_args()
+
+    baseline = dict()
+    if os.path.isfile(arguments.baseline):
+        with open(arguments.baseline, encoding="utf-8") as file:
+            # entries without a relative cost (older files) are not compared
+            baseline = {name: base for name, base in json.load(file).items() if "cost" in base}
+
+    results = dict()
+    regressions = list()
+    unit = reference()
+    with tempfile.TemporaryDirectory() as folder:
+        for name, operation in cases(folder).items():
+            if arguments.only and not any(text in name for text in arguments.only):
+                continue
+            base = None if arguments.save else baseline.get(name)
+            results[name] = measure(operation, unit, base, arguments.tolerance)
+            report(name, results[name], baseline.get(name), arguments.tolerance)
+            if regressed(results[name], base, arguments.tolerance):
+                regressions.append(name)
+
+    if arguments.save:
+        baseline.update(results)
+        with open(arguments.baseline, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"baseline saved: {arguments.baseline}")
+        return 0
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Toast construction: time and memory per instance.
+
+Toasts without a document, with a small document, and clones
+of a reminder are made many times; memory is what stays allocated
+per toast while they are all kept alive.
+
+Usage:  python benchmarks/toast.py [count]
+"""
+
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from toasted.toasted import Toast, Tree
+
+
+def document():
+    root = Toast.Section("toast")
+    root.append(Toast.Visual())
+    root[0].append(Toast.Binding(Toast.Text("Hello")))
+    return Tree(root)
+
+
+def measure(name: str, make, count: int):
+    elapsed = min(timeit.repeat(make, number=count, repeat=5)) / count
+    gc.collect()
+    tracemalloc.start()
+    toasts = [make() for _ in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del toasts
+    print(f"{name:<10} {elapsed * 1e6:8.2f} us   {size / count:8.0f} B/toast")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    reminder = Toast.Reminder()
+    measure("empty", lambda: Toast(), count)
+    measure("document", lambda: Toast(document()), count)
+    measure("clone", reminder.clone, count)
@@ -5,69 +5,294 @@ See at: https: //learn.microsoft.com/en-us/windows/apps/design/
         shell/tiles-and-notifications/adaptive-interactive-toasts?tabs=appsdk
 """
 
+from __future__ import annotations
 
 # general
 import os as os
 import datetime as dt
 import platform as pt
+import importlib as il
+import time as tm
+import functools as ft
+import itertools as it
+import threading as th
+import queue as qu
+import re as re
+import sys as sy
+import io as io
+import weakref as wr
+import collections as cl
+import heapq as hq
+import bisect as bs
 
 # xml document packages
 from xml.etree import ElementTree as xe
-import winsdk.windows.data.xml.dom as wx
+
+
+
+
+class LazyModule:
+
+    """
+    Stand-in for a winsdk namespace.
+    The real module is imported the first time one of its attributes is needed,
+    so importing toasted never loads the Windows Runtime projection by itself.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self):
+        """
+        Import the real namespace (once) and return it
+        """
+        if self._module is None:
+            self._module = il.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+# xml document packages
+wx = LazyModule("winsdk.windows.data.xml.dom")
 
 # specific
-import winsdk as wk
-import winsdk.windows.foundation as wf
-import winsdk.windows.ui.notifications as wn
+wf = LazyModule("winsdk.windows.foundation")
+wn = LazyModule("winsdk.windows.ui.notifications")
+
+# only the opt-in Store uses them
+sq = LazyModule("sqlite3")
+zl = LazyModule("zlib")
+js = LazyModule("json")
+
+# only Assets, ImageCache and Probe.export use them
+pl = LazyModule("pathlib")
+hl = LazyModule("hashlib")
+tf = LazyModule("tempfile")
 
 
 
 
 class Element(xe.Element):
 
+    # weak reference to the tree the element is in (see Tree.adopt):
+    # edits count in the revision of that tree only
+    owner: wr.ref | None = None
+
     def __init__(self, tag: str, text="", **attributes):
         super().__init__(tag, **attributes)
-        self.text = text
+        # a new element is in no tree yet, nothing to mark
+        xe.Element.text.__set__(self, text)
+
+    def touch(self, *added: xe.Element, shape: bool = False):
+        """
+        Mark the element as edited: the revision of its tree grows.
+        The nodes 'added' under it join the tree. With 'shape' the edit changes
+        what the tree lookups see (children or ids), see Tree.index.
+        The mutators and the attrib dictionary call it, see Attributes.
+        """
+        owner = self.owner
+        tree = None if owner is None else owner()
+        if tree is not None:
+            tree._revision += 1
+            if added:
+                tree.adopt(*added)
+            elif shape:
+                tree._shape += 1
+
+    @property
+    def text(self):
+        return xe.Element.text.__get__(self)
+
+    @text.setter
+    def text(self, value):
+        xe.Element.text.__set__(self, value)
+        self.touch()
+
+    @property
+    def tail(self):
+        return xe.Element.tail.__get__(self)
+
+    @tail.setter
+    def tail(self, value):
+        xe.Element.tail.__set__(self, value)
+        self.touch()
+
+    @property
+    def attrib(self):
+        attrib = xe.Element.attrib.__get__(self)
+        if attrib.__class__ is not Attributes:
+            # tracked from the first time it is handed out
+            attrib = Attributes(self, attrib)
+            xe.Element.attrib.__set__(self, attrib)
+        return attrib
+
+    @attrib.setter
+    def attrib(self, value):
+        xe.Element.attrib.__set__(self, Attributes(self, value))
+        self.touch(shape=True)
+
+    def set(self, key, value):
+        xe.Element.set(self, key, value)
+        self.touch(shape=key == "id")
+
+    def append(self, subelement):
+        xe.Element.append(self, subelement)
+        self.touch(subelement)
+
+    def extend(self, elements):
+        elements = tuple(elements)
+        xe.Element.extend(self, elements)
+        self.touch(*elements)
+
+    def insert(self, index, subelement):
+        xe.Element.insert(self, index, subelement)
+        self.touch(subelement)
+
+    def remove(self, subelement):
+        xe.Element.remove(self, subelement)
+        self.touch(shape=True)
+
+    def clear(self):
+        xe.Element.clear(self)
+        self.touch(shape=True)
+
+    def __setitem__(self, index, element):
+        xe.Element.__setitem__(self, index, element)
+        self.touch(*(element if isinstance(index, slice) else (element,)), shape=True)
+
+    def __delitem__(self, index):
+        xe.Element.__delitem__(self, index)
+        self.touch(shape=True)
+
+    # escaping tables, same output as xml.etree (also used by Node and Blueprint)
+    TEXT = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+    ATTRIB = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;",
+                            "\r": "&#13;", "\n": "&#10;", "\t": "&#09;"})
 
     @property
     def indented(self):
-        # get xml string and send it to the parser
-        str_tree = str(self)
-        temp_element = xe.XML(str_tree)
-        # indent it and cast in string
-        xe.indent(temp_element)
-        indented_xml = xe.tostring(temp_element, encoding="unicode")
-        return indented_xml
+        return self.pretty()
+
+    def pretty(self, stream=None, max_depth: int = None, max_length: int = None, space: str = "  "):
+        """
+        Write the element indented like xe.indent would, walking the live tree once.
+        Nodes deeper than 'max_depth' are folded into '...', output longer than
+        'max_length' characters is cut and ends with '...'.
+        Returns the string when no stream is given.
+        """
+        out = io.StringIO() if stream is None else stream
+        write = out.write
+        if max_length is not None:
+            left = [max_length]
+
+            def write(chunk, _write=out.write):
+                if len(chunk) > left[0]:
+                    _write(chunk[:left[0]] + "...")
+                    raise EOFError
+                left[0] -= len(chunk)
+                _write(chunk)
+        text, attrib = Element.TEXT, Element.ATTRIB
+        # strings are written as they are, nodes come with their level and tail
+        stack = [(self, 0, "")]
+        try:
+            while stack:
+                item = stack.pop()
+                if item.__class__ is str:
+                    write(item)
+                    continue
+                node, level, tail = item
+                tag = node.tag
+                if tag is xe.Comment:
+                    write("<!--%s-->%s" % (node.text or "", tail))
+                    continue
+                opening = "<" + tag + "".join(
+                    ' %s="%s"' % (key, str(value).translate(attrib))
+                    for key, value in node.items())
+                content = node.text
+                if not len(node):
+                    if content:
+                        write("%s>%s</%s>%s" % (opening, content.translate(text), tag, tail))
+                    else:
+                        write(opening + " />" + tail)
+                    continue
+                if max_depth is not None and level >= max_depth:
+                    write("%s>...</%s>%s" % (opening, tag, tail))
+                    continue
+                inner = "\n" + space * (level + 1)
+                if content and content.strip():
+                    inner = content.translate(text)
+                write(opening + ">" + inner)
+                stack.append("</%s>%s" % (tag, tail))
+                # the last child dedents to the closing tag
+                after = "\n" + space * level
+                for child in reversed(node):
+                    own = child.tail
+                    child_tail = own.translate(text) if own and own.strip() else after
+                    stack.append((child, level + 1, child_tail))
+                    after = "\n" + space * (level + 1)
+        except EOFError:
+            pass
+        return out.getvalue() if stream is None else None
 
     @property
     def children(self) -> list[str]:
-        children = list()
-        for sub in self.iterfind("./"):
-            children.append(sub.tag)
-        return children
+        """
+        Tags of the children, in order
+        """
+        return [child.tag for child in self]
+
+    # specialized element classes by tag, see factory
+    KINDS: dict[str, type] = dict()
 
     @classmethod
-    def fromstring(cls, string: str):
+    def factory(cls, tag: str, attrib: dict):
+        """
+        Element factory for the xml tree builder.
+        Tags with a specialized class (Element.KINDS) get it.
+        Attributes are copied as a dict, so names like 'text' cannot clash with the init keywords.
+        """
+        cls = Element.KINDS.get(tag, cls) if cls is Element else cls
+        element = cls(tag)
+        xe.Element.attrib.__get__(element).update(attrib)
+        return element
+
+    @classmethod
+    def parser(cls) -> xe.XMLParser:
+        """
+        Get a xml parser that directly builds Element objects
+        """
+        builder = xe.TreeBuilder(element_factory=cls.factory)
+        return xe.XMLParser(target=builder)
+
+    @classmethod
+    def fromstring(cls, string: str | bytes):
         """
         Get Element with its subelement from string.
-        This classmethod is needed in order to implement string management outside the init method.
-        """
-        # TODO Maybe is there an alternative way to natively implement the xe.fromstring into Element class?
-        # call fromstring method from the ElementTree class
-        raw = xe.fromstring(string)
-        # search for subelements
-        subelements = list(raw.iterfind("./"))
-        is_parent = True if len(subelements) > 0 else False
-        # if the element has children recursevly call method until build the entire element tree
-        if is_parent:
-            parent = cls(raw.tag, text=raw.text, **raw.attrib)
-            for sub in subelements:
-                sub_string = xe.tostring(sub)
-                child = Element.fromstring(sub_string)
-                parent.append(child)
-            return parent
-        else:
-            return cls(raw.tag, text=raw.text, **raw.attrib)
+        The whole tree is built in a single pass by the parser.
+        """
+        parser = cls.parser()
+        parser.feed(string)
+        return parser.close()
+
+    @classmethod
+    def iterparse(cls, source, events: tuple = ("end",)):
+        """
+        Parse incrementally a file name or file object yielding (event, Element) pairs.
+        Useful for large toast-definition files: with the 'end' event an element
+        is complete, so it can be processed and then removed from its parent.
+        """
+        return xe.iterparse(source, events=events, parser=cls.parser())
 
 
     @classmethod
@@ -84,28 +309,64 @@ class Element(xe.Element):
         """
         Yield one child element at a time
         """
-        for child in self.children:
-            xpath = "./" + child
-            yield self.find(xpath)
+        yield from self
 
     def is_parent(self):
-        return False if self.children == [] else True
+        return len(self) > 0
+
+    @staticmethod
+    def duplicate(element: xe.Element) -> Element:
+        """
+        Copy tag, attributes, text and tail of an element, without its children.
+        The twin is made with the xml.etree base methods: it is in no tree yet,
+        so there is nothing to track and no init to run.
+        """
+        cls = element.__class__ if isinstance(element, Element) else Element
+        twin = xe.Element.__new__(cls)
+        # the attributes are copied by the base init
+        xe.Element.__init__(twin, element.tag, xe.Element.attrib.__get__(element))
+        text, tail = xe.Element.text.__get__(element), xe.Element.tail.__get__(element)
+        if text is not None:
+            xe.Element.text.__set__(twin, text)
+        if tail is not None:
+            xe.Element.tail.__set__(twin, tail)
+        return twin
 
     def copy(self):
-        string = str(self)
-        copied = Element.fromstring(string)
+        """
+        Deep copy of the element, built node by node without any string round trip
+        """
+        duplicate, append = Element.duplicate, xe.Element.append
+        copied = duplicate(self)
+        stack = [(self, copied)]
+        while stack:
+            source, target = stack.pop()
+            for child in source:
+                twin = duplicate(child)
+                append(target, twin)
+                if len(child):
+                    stack.append((child, twin))
+            if target.__class__ is Actions:
+                target.inputs = source.inputs
         return copied
 
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
     def delete(self, xpath: str, *only: int):
         """
-        Delete children elements
+        Delete children elements.
+        The removed elements are returned as they are, already detached from the tree.
         """
         children = self.findall(xpath)
         trash = list()
         for i, elem in enumerate(children):
             # delete only indicated elements
-            if i in only or only == []:
-                trash.append(elem.copy())
+            if i in only or not only:
+                trash.append(elem)
                 self.remove(elem)
         return trash
 
@@ -118,27 +379,333 @@ class Element(xe.Element):
         return self.indented
 
 
-class Tree(xe.ElementTree):
+class Attributes(dict):
 
-    def __init__(self, source = None):
+    """
+    Attribute dictionary of an Element.
+    Changes made in place mark the element as edited, like its mutators do.
+    The element is weakly referenced, so the two don't keep each other alive.
+    """
+
+    __slots__ = ("node",)
+
+    def __init__(self, node: Element, attributes: dict = ()):
+        super().__init__(attributes)
+        self.node = wr.ref(node)
+
+    def edited(self, shape: bool = False):
+        # shape: the id changed, see Element.touch
+        node = self.node()
+        if node is not None:
+            node.touch(shape=shape)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.edited(key == "id")
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.edited(key == "id")
+
+    def __ior__(self, other):
+        key = self.get("id")
+        super().update(other)
+        self.edited(self.get("id") != key)
+        return self
+
+    def update(self, *args, **kwargs):
+        key = self.get("id")
+        super().update(*args, **kwargs)
+        self.edited(self.get("id") != key)
+
+    def setdefault(self, key, default=None):
+        missing = key not in self
+        value = super().setdefault(key, default)
+        if missing:
+            self.edited(key == "id")
+        return value
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self.edited(key == "id")
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self.edited(item[0] == "id")
+        return item
+
+    def clear(self):
+        shape = "id" in self
+        super().clear()
+        self.edited(shape)
+
+
+class Actions(Element):
+
+    """
+    The 'actions' node.
+    'input' children are kept before the 'action' ones while they are added,
+    as the toast schema wants, so the node never needs to be sorted.
+    """
+
+    inputs: int = 0     # number of leading 'input' children
+
+    def __init__(self, tag: str = "actions", text = "", **attributes):
+        super().__init__(tag, text=text, **attributes)
+        self.inputs = 0
+
+    def append(self, subelement):
+        if subelement.tag == "input":
+            super().insert(self.inputs, subelement)
+            self.inputs += 1
+        else:
+            super().append(subelement)
+
+    def extend(self, elements):
+        for element in elements:
+            self.append(element)
+
+    def insert(self, index, subelement):
+        # keep the index inside the section of its kind
+        index = max(len(self) + index, 0) if index < 0 else index
+        if subelement.tag == "input":
+            super().insert(min(index, self.inputs), subelement)
+            self.inputs += 1
+        else:
+            super().insert(max(index, self.inputs), subelement)
+
+    def remove(self, subelement):
+        super().remove(subelement)
+        if subelement.tag == "input":
+            self.inputs -= 1
+
+    def clear(self):
+        super().clear()
+        self.inputs = 0
+
+    def __setitem__(self, index, element):
+        # slice or replacement of a different kind: sort out again
+        element = tuple(element) if isinstance(index, slice) else element
+        xe.Element.__setitem__(self, index, element)
+        children = list(self)
+        ordered = [c for c in children if c.tag == "input"]
+        self.inputs = len(ordered)
+        ordered.extend(c for c in children if c.tag != "input")
+        if ordered != children:
+            xe.Element.__setitem__(self, slice(None), ordered)
+        self.touch(*(element if isinstance(index, slice) else (element,)), shape=True)
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.inputs = sum(1 for child in self if child.tag == "input")
+
+
+Element.KINDS["actions"] = Actions
 
-        WXMLs = wx.XmlElement, wx.XmlDocument
 
 
+
+class Node:
+
+    """
+    Compact xml node for the toasts waiting in queues, see Draft.
+    Slots in place of an Element with its attribute dict: attributes are kept in one
+    flat (name, value, ...) tuple. Tag and names are interned, and so are the fixed
+    values in WORDS (like 'protocol' or 'ToastGeneric', repeated in every toast).
+    Attribute tuples made only of those are shared by the equal ones (see settle).
+    Free values (labels, arguments, uris) are kept as they are, never interned,
+    so nothing holds them once the draft is gone.
+    It becomes an Element tree, or an xml string, only when the toast is sent.
+    It has the part of the Element interface the Toast builders use.
+    """
+
+    __slots__ = "tag", "text", "_pairs", "_nodes"
+
+    # fixed values of the builders (digits for the line and weight hints),
+    # the schema enumerations are added after Schema
+    WORDS: dict[str, str] = {word: word for word in ("", "true", "false", "http:", "ToastGeneric",
+                                                     "snooze", "dismiss", "returned_arguments", *"0123456789")}
+    # attribute tuples of names and fixed values, shared by the equal ones (up to SHARE of them)
+    SHARED: dict[tuple, tuple] = dict()
+    SHARE: int = 1024
+
+    def __init__(self, tag: str, text="", **attributes):
+        self.tag = sy.intern(tag)
+        self.text = text or None
+        self._pairs = Node.pairs(attributes)
+        self._nodes = ()
+
+    @staticmethod
+    def pairs(attributes: dict) -> tuple:
+        if not attributes:
+            return ()
+        intern, words = sy.intern, Node.WORDS
+        pairs = tuple(it.chain.from_iterable((intern(key), words.get(value, value)) for key, value in attributes.items()))
+        return Node.share(pairs)
+
+    @staticmethod
+    def share(pairs: tuple) -> tuple:
+        # values equal to a word are the word itself (see pairs and set), so an
+        # equality check in one C call is enough: with a free value it is not kept
+        if not Node.WORDS.keys() >= set(pairs[1::2]):
+            return pairs
+        shared = Node.SHARED.get(pairs)
+        if shared is None and len(Node.SHARED) < Node.SHARE:
+            shared = Node.SHARED[pairs] = pairs
+        return pairs if shared is None else shared
+
+    @property
+    def attrib(self) -> dict:
+        """
+        Copy of the attributes
+        """
+        pairs = self._pairs
+        return dict(zip(pairs[::2], pairs[1::2]))
+
+    def keys(self):
+        return self._pairs[::2]
+
+    def items(self):
+        pairs = self._pairs
+        return list(zip(pairs[::2], pairs[1::2]))
+
+    def get(self, key: str, default=None):
+        pairs = self._pairs
+        for index in range(0, len(pairs), 2):
+            if pairs[index] == key:
+                return pairs[index + 1]
+        return default
+
+    def set(self, key: str, value):
+        key = sy.intern(key)
+        value = Node.WORDS.get(value, value)
+        old = self._pairs
+        keys = old[::2]
+        if key in keys:
+            index = 2 * keys.index(key) + 1
+            pairs = old[:index] + (value,) + old[index + 1:]
+        else:
+            pairs = old + (key, value)
+        # shared once the node is complete, see settle
+        self._pairs = pairs
+
+    def settle(self):
+        """
+        Share the attribute tuples of the node and its subnodes, see share.
+        The builders set the attributes one by one: they are shared once at the end
+        (Draft does it) instead of at every set.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            node._pairs = Node.share(node._pairs)
+            stack.extend(node._nodes)
+
+    def append(self, node: Node):
+        self._nodes += (node,)
+
+    def extend(self, nodes):
+        self._nodes += tuple(nodes)
+
+    def insert(self, index: int, node: Node):
+        nodes = list(self._nodes)
+        nodes.insert(index, node)
+        self._nodes = tuple(nodes)
+
+    def remove(self, node: Node):
+        nodes = list(self._nodes)
+        nodes.remove(node)
+        self._nodes = tuple(nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __getitem__(self, index):
+        return self._nodes[index]
+
+    @classmethod
+    def of(cls, element: xe.Element) -> Node:
+        """
+        Compact an element and its subelements (tails are not kept)
+        """
+        node = cls(element.tag, element.text)
+        # set apart: names like 'text' would clash with the init keywords
+        node._pairs = Node.pairs(element.attrib)
+        node._nodes = tuple(cls.of(child) for child in element)
+        return node
+
+    def element(self) -> Element:
+        """
+        Get the Element tree, built through Element.factory ('actions' become Actions)
+        """
+        element = Element.factory(self.tag, self.attrib)
+        if self.text:
+            element.text = self.text
+        element.extend(child.element() for child in self._nodes)
+        return element
+
+    def write(self, parts: list):
+        """
+        Append the xml of the node to a list of strings, as xe.tostring writes it
+        """
+        pairs = self._pairs
+        parts.append("<" + self.tag)
+        for index in range(0, len(pairs), 2):
+            parts.append(' %s="%s"' % (pairs[index], str(pairs[index + 1]).translate(Element.ATTRIB)))
+        nodes = self._nodes
+        if not self.text and not nodes:
+            parts.append(" />")
+            return
+        parts.append(">")
+        if self.text:
+            parts.append(self.text.translate(Element.TEXT))
+        if self.tag == "actions":
+            # inputs first, as Actions keeps them
+            nodes = sorted(nodes, key=lambda node: node.tag != "input")
+        for child in nodes:
+            child.write(parts)
+        parts.append("</%s>" % self.tag)
+
+    def tostring(self) -> str:
+        parts = list()
+        self.write(parts)
+        return "".join(parts)
+
+    def __repr__(self):
+        return self.tostring()
+
+
+class Tree(xe.ElementTree):
+
+    def __init__(self, source = None):
+        # edit tracking, see revision and adopt
+        self._revision = 0
+        self._shape = 0         # edits of children and ids only, see index
+        self._ref = None
+        # tag and id lookup tables, see index
+        self._index = None
+
         if isinstance(source, Element):
             super().__init__(source)
-        elif isinstance(source, WXMLs):
-            tree = WXMLs.get_xml()
+        elif hasattr(source, "get_xml"):
+            # winsdk XmlElement / XmlDocument: checked by duck typing
+            # so that building a tree never forces winsdk to load
+            tree = Element.fromstring(source.get_xml())
             super().__init__(tree)
         elif isinstance(source, str):
             is_xml = os.path.splitext(source)[1] in (".xml", ".txt")
             if os.path.isfile(source) and is_xml:
-                super().parse(source)
+                super().__init__()
+                super().parse(source, parser=Element.parser())
             else:
                 # if is a string try to load by string parser
                 # otherwise init an empty root tag element
                 try:
-                    tree = xe.XML(source)
+                    tree = Element.fromstring(source)
                     super().__init__(tree)
                 except xe.ParseError:
                     default_tag = Element(source[:10])
@@ -150,13 +717,13 @@ class Tree(xe.ElementTree):
 
     @property
     def indented(self):
-        # get xml string and send it to the parser
-        str_tree = str(self)
-        temp_element_tree = xe.XML(str_tree)
-        # indent it and cast in string
-        xe.indent(temp_element_tree)
-        indented_xml = xe.tostring(temp_element_tree, encoding="unicode")
-        return indented_xml
+        return self.pretty()
+
+    def pretty(self, stream=None, max_depth: int = None, max_length: int = None, space: str = "  "):
+        """
+        Indented xml of the tree, see Element.pretty.
+        """
+        return Element.pretty(self._root, stream, max_depth, max_length, space)
 
     @property
     def root(self):
@@ -165,6 +732,90 @@ class Tree(xe.ElementTree):
         """
         return self.getroot()
 
+    @property
+    def revision(self) -> int:
+        """
+        Edit counter of the tree: it grows whenever one of its nodes is edited.
+        Edits of other trees, or of elements in no tree, leave it as it is.
+        Plain xml.etree elements, like the ones xe.SubElement adds, are not tracked.
+        The nodes are tracked from the first read: before it there is nothing to compare.
+        """
+        if self._ref is None:
+            self._ref = wr.ref(self)
+            self.adopt(self._root)
+        return self._revision
+
+    def adopt(self, *nodes: xe.Element):
+        """
+        Make the nodes, and everything below them, count their edits in this tree.
+        Element does it for the nodes added under a node of the tree; a node
+        is tracked in the last tree it joined.
+        """
+        ref = self._ref
+        for node in nodes:
+            for child in node.iter():
+                if isinstance(child, Element):
+                    child.owner = ref
+        self._revision += 1
+        self._shape += 1
+
+    @property
+    def index(self) -> tuple[dict, dict]:
+        """
+        Lookup tables of the tree: tag -> nodes in document order, id -> first node with it.
+        They are rebuilt in one walk only after the children or the ids changed:
+        text and other attribute edits keep them, lookups in between are dictionary hits.
+        """
+        self.revision     # tracking starts with the first lookup
+        shape = self._shape
+        if self._index is None or self._index[0] != shape:
+            tags, ids = dict(), dict()
+            for node in self._root.iter():
+                tags.setdefault(node.tag, []).append(node)
+                key = node.get("id")
+                if key is not None:
+                    ids.setdefault(key, node)
+            self._index = (shape, tags, ids)
+        return self._index[1:]
+
+    def itertag(self, tag: str):
+        """
+        Iterate over the nodes with the tag, at any depth
+        """
+        return iter(self.index[0].get(tag, ()))
+
+    def bytag(self, tag: str) -> list:
+        """
+        Get the nodes with the tag, at any depth
+        """
+        return list(self.itertag(tag))
+
+    def byid(self, key: str):
+        """
+        Get the node with the id attribute, None if missing
+        """
+        return self.index[1].get(key)
+
+    def _setroot(self, element):
+        super()._setroot(element)
+        if self._ref is not None:
+            self.adopt(element)
+
+    def parse(self, source, parser=None):
+        root = super().parse(source, parser)
+        if self._ref is not None:
+            self.adopt(root)
+        return root
+
+    def clone(self) -> Tree:
+        """
+        Independent copy of the tree, see Element.copy.
+        The nodes are copied up front, not shared until written: xml.etree nodes
+        have no parent link, so an edit of a shared node could not tell which
+        tree it was meant for. The copy costs less than building the toast again.
+        """
+        return Tree(Element.copy(self._root))
+
 
     @classmethod
     def fromstring(cls, string: str):
@@ -173,8 +824,9 @@ class Tree(xe.ElementTree):
 
     @classmethod
     def read(cls, path: str):
-        document = cls.parse(path)
-        return cls(document)
+        tree = cls()
+        tree.parse(path, parser=Element.parser())
+        return tree
 
 
     def set(self, node: str, key: str, value: str):
@@ -227,25 +879,44 @@ class Tree(xe.ElementTree):
         return self.indented
 
 
-class Event(list):
+class Event:
 
-    def __init__(self, notification, handler):
-        super().__init__()
-        event = notification, handler
-        self.append(event)
+    """
+    User response to a toast: activated, dismissed or failed.
+    """
 
+    ACTIVATED: str = "activated"
+    DISMISSED: str = "dismissed"
+    FAILED: str = "failed"
+
+    # dismissal reasons (ToastDismissalReason)
+    USER_CANCELED: int = 0
+    APPLICATION_HIDDEN: int = 1
+    TIMED_OUT: int = 2
+
+    __slots__ = "kind", "toast", "arguments", "inputs", "reason", "error", "time"
+
+    def __init__(self, kind: str, toast = None, arguments: str = None, inputs: dict = None,
+                 reason: int = None, error: int = None):
+        self.kind = kind
+        self.toast = toast
+        self.arguments = arguments      # activated: arguments of the clicked element
+        self.inputs = inputs            # activated: values of the input boxes by id
+        self.reason = reason            # dismissed: see the dismissal reasons
+        self.error = error              # failed: error code
+        self.time = tm.time()
 
     @property
-    def active(toast):
-        toast.add
+    def active(self) -> bool:
+        return self.kind == Event.ACTIVATED
 
     @property
-    def is_ignored(self):
-        pass
+    def is_ignored(self) -> bool:
+        return self.kind == Event.DISMISSED
 
     @property
-    def is_failed(self):
-        pass
+    def is_failed(self) -> bool:
+        return self.kind == Event.FAILED
 
     @staticmethod
     def Activated(event):
@@ -261,12 +932,874 @@ class Event(list):
 
 
     @classmethod
-    def Dismiss():
-        pass
+    def Activate(cls, toast = None, arguments: str = None, inputs: dict = None):
+        return cls(Event.ACTIVATED, toast, arguments=arguments, inputs=inputs)
 
     @classmethod
-    def Fault():
-        pass
+    def Dismiss(cls, toast = None, reason: int = USER_CANCELED):
+        return cls(Event.DISMISSED, toast, reason=reason)
+
+    @classmethod
+    def Fault(cls, toast = None, error: int = None):
+        return cls(Event.FAILED, toast, error=error)
+
+    def __repr__(self):
+        details = {Event.ACTIVATED: f"arguments={self.arguments!r}, inputs={self.inputs!r}",
+                   Event.DISMISSED: f"reason={self.reason!r}",
+                   Event.FAILED: f"error={self.error!r}"}
+        return f"<Event {self.kind}: {details.get(self.kind, '')}>"
+
+
+
+
+class Dispatcher:
+
+    """
+    Run the user event handlers away from the WinRT callback threads.
+    Callbacks only put the Event in a bounded queue and return, worker threads
+    call the handlers, so a slow handler never holds back other toasts.
+    When the queue is full the event is dropped at once ('drop' policy) or after
+    waiting up to 'timeout' seconds for room ('block' policy, back-pressure).
+    """
+
+    _current = None
+    _guard = th.Lock()
+
+    def __init__(self, workers: int = 1, size: int = 1024, policy: str = "drop", timeout: float = 0.1):
+        self.workers = workers
+        self.policy = policy
+        self.timeout = timeout
+        self.queue = qu.Queue(size)
+        # handlers called for the events of every toast
+        self.handlers = {Event.ACTIVATED: list(), Event.DISMISSED: list(), Event.FAILED: list()}
+        self.dispatched = 0
+        self.dropped = 0
+        self.errors = 0
+        self._threads: list[th.Thread] = list()
+        self._lock = th.Lock()
+
+    @staticmethod
+    def current() -> Dispatcher:
+        """
+        Get the process wide dispatcher
+        """
+        with Dispatcher._guard:
+            if Dispatcher._current is None:
+                Dispatcher._current = Dispatcher()
+            return Dispatcher._current
+
+    @staticmethod
+    def use(dispatcher: Dispatcher) -> Dispatcher:
+        """
+        Set the process wide dispatcher and return the previous one
+        """
+        with Dispatcher._guard:
+            previous = Dispatcher._current
+            Dispatcher._current = dispatcher
+            return previous
+
+    def subscribe(self, kind: str, handler):
+        self.handlers[kind].append(handler)
+        return handler
+
+    def unsubscribe(self, kind: str, handler):
+        if handler in self.handlers[kind]:
+            self.handlers[kind].remove(handler)
+
+    def wanted(self, event: Event) -> bool:
+        """
+        Check if there is any handler for the event
+        """
+        handlers = getattr(event.toast, "_handlers", None)
+        return bool(self.handlers[event.kind] or handlers and handlers.get(event.kind))
+
+    def put(self, event: Event) -> bool:
+        """
+        Queue the event for the handlers. Return False if it was dropped.
+        """
+        if not self._threads:
+            self.start()
+        try:
+            if self.policy == "block":
+                self.queue.put(event, timeout=self.timeout)
+            else:
+                self.queue.put_nowait(event)
+        except qu.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                name = f"toasted-dispatcher-{len(self._threads)}"
+                thread = th.Thread(target=self._work, name=name, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """
+        Handle what is queued, then stop the workers
+        """
+        with self._lock:
+            threads, self._threads = self._threads, list()
+        for _ in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def join(self):
+        """
+        Wait until every queued event has been handled
+        """
+        self.queue.join()
+
+    def _work(self):
+        while True:
+            event = self.queue.get()
+            try:
+                if event is None:
+                    return
+                self._handle(event)
+            finally:
+                self.queue.task_done()
+
+    def _handle(self, event: Event):
+        handlers = getattr(event.toast, "_handlers", None) or dict()
+        for handler in (*handlers.get(event.kind, ()), *self.handlers[event.kind]):
+            try:
+                handler(event)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+        with self._lock:
+            self.dispatched += 1
+
+    def stats(self) -> dict[str, int]:
+        return {"queued": self.queue.qsize(), "dispatched": self.dispatched,
+                "dropped": self.dropped, "errors": self.errors}
+
+
+
+
+class NotifierPool:
+
+    """
+    Thread safe pool of toast notifiers keyed by (app_id, user).
+    High rate senders get back a warm notifier instead of creating one per toast;
+    notifiers unused for 'idle' seconds are dropped.
+    """
+
+    def __init__(self, factory, idle: float = 300.0, clock = tm.monotonic):
+        self.factory = factory      # callable (app_id, user) -> notifier
+        self.idle = idle
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = th.Lock()
+        self._notifiers: dict[tuple, list] = dict()    # key -> [notifier, last use]
+        self._swept = clock()
+
+    def get(self, app_id: str, user = None):
+        """
+        Get the notifier of the app (and user), creating it on a miss
+        """
+        key = app_id, user
+        now = self.clock()
+        with self._lock:
+            if now - self._swept >= self.idle:
+                self._evict(now)
+            entry = self._notifiers.get(key)
+            if entry is not None:
+                self.hits += 1
+                entry[1] = now
+                return entry[0]
+            self.misses += 1
+        # created out of the lock, a concurrent miss on the same key keeps the first one
+        notifier = self.factory(app_id, user)
+        with self._lock:
+            entry = self._notifiers.setdefault(key, [notifier, now])
+        return entry[0]
+
+    def _evict(self, now: float):
+        idle = [key for key, (_, used) in self._notifiers.items() if now - used >= self.idle]
+        for key in idle:
+            del self._notifiers[key]
+        self.evictions += len(idle)
+        self._swept = now
+
+    def clear(self):
+        with self._lock:
+            self._notifiers.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"size": len(self._notifiers), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self._notifiers)
+
+
+
+
+class Backend:
+
+    """
+    Notification backend.
+    It exposes the small part of ToastNotificationManager and XmlDocument
+    that Toast needs, so the build -> serialize -> show pipeline can run
+    on the Windows Runtime or on an in-process stand-in.
+    """
+
+    _current = None
+
+    def __init__(self):
+        self.notifiers = NotifierPool(self.create_toast_notifier)
+
+    @staticmethod
+    def current() -> Backend:
+        """
+        Get the process wide backend (WinRT unless another one is in use)
+        """
+        if Backend._current is None:
+            Backend._current = WinRTBackend()
+        return Backend._current
+
+    @staticmethod
+    def use(backend: Backend) -> Backend:
+        """
+        Set the process wide backend and return the previous one
+        """
+        previous = Backend._current
+        Backend._current = backend
+        return previous
+
+    # XmlDocument
+    def load_xml(self, xml: str):
+        raise NotImplementedError
+
+    def set_attribute(self, document, key: str, value: str):
+        """
+        Set an attribute of the document root element, return the changed document
+        """
+        raise NotImplementedError
+
+    # ToastNotification
+    def create_notification(self, document):
+        raise NotImplementedError
+
+    # NotificationData
+    def create_notification_data(self, values: dict, sequence_number: int = 0):
+        raise NotImplementedError
+
+    # ScheduledToastNotification
+    def create_scheduled_notification(self, document, delivery: dt.datetime):
+        raise NotImplementedError
+
+    # ToastNotificationManager
+    def create_toast_notifier(self, app_id: str, user = None):
+        raise NotImplementedError
+
+    def history(self, user = None):
+        raise NotImplementedError
+
+    def get_template_content(self, number: int):
+        raise NotImplementedError
+
+    # event payloads
+    def activated(self, event) -> tuple[str, dict]:
+        """
+        Get arguments and user inputs from an activated event
+        """
+        raise NotImplementedError
+
+    def dismissed(self, event) -> int:
+        """
+        Get the reason code from a dismissed event
+        """
+        raise NotImplementedError
+
+    def failed(self, event) -> int:
+        """
+        Get the error code from a failed event
+        """
+        raise NotImplementedError
+
+
+class WinRTBackend(Backend):
+
+    """
+    Windows Runtime backend, the real one.
+    """
+
+    @staticmethod
+    def manager(user = None):
+        # check call namespace preference
+        manager = wn.ToastNotificationManager
+        return manager if user is None else manager.get_for_user(user)
+
+    def load_xml(self, xml: str):
+        document = wx.XmlDocument()
+        document.load_xml(xml)
+        return document
+
+    def set_attribute(self, document, key: str, value: str):
+        document.document_element.set_attribute(key, value)
+        return document
+
+    def create_notification(self, document):
+        return wn.ToastNotification(document)
+
+    def create_scheduled_notification(self, document, delivery: dt.datetime):
+        return wn.ScheduledToastNotification(document, delivery)
+
+    def create_notification_data(self, values: dict, sequence_number: int = 0):
+        data = wn.NotificationData()
+        for key, value in values.items():
+            data.values.insert(key, str(value))
+        data.sequence_number = sequence_number
+        return data
+
+    def create_toast_notifier(self, app_id: str, user = None):
+        return self.manager(user).create_toast_notifier(app_id)
+
+    def history(self, user = None):
+        return self.manager(user).history
+
+    def get_template_content(self, number: int):
+        return wn.ToastNotificationManager.get_template_content(number)
+
+    def activated(self, event) -> tuple[str, dict]:
+        # cast factory function for win Object
+        to_string = lambda val: wf.IPropertyValue._from(val).get_string()
+        args = wn.ToastActivatedEventArgs._from(event)
+        inputs = {k: to_string(v) for k, v in args.user_input.items()}
+        return args.arguments, inputs
+
+    def dismissed(self, event) -> int:
+        # typed handlers already get the args, otherwise cast them
+        args = event if hasattr(event, "reason") else wn.ToastDismissedEventArgs._from(event)
+        return int(args.reason)
+
+    def failed(self, event) -> int:
+        args = event if hasattr(event, "error_code") else wn.ToastFailedEventArgs._from(event)
+        error = args.error_code
+        return getattr(error, "value", error)
+
+
+def timed(method):
+    """
+    Record the duration of a RecordingBackend call under the method name
+    """
+    @ft.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = tm.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            backend = getattr(self, "backend", self)
+            backend.timings.setdefault(method.__name__, []).append(tm.perf_counter() - start)
+    return wrapper
+
+
+class RecordingBackend(Backend):
+
+    """
+    In-process backend that records instead of showing.
+    Shown notifications are kept in 'shown', user events can be simulated with
+    activate / dismiss / fail, and every call is timed in 'timings'.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.shown: list[RecordedNotification] = list()
+        self.scheduled: list[RecordedNotification] = list()
+        self.updates: list[tuple] = list()
+        self.timings: dict[str, list[float]] = dict()
+        self._history = RecordedHistory(self)
+
+    @timed
+    def load_xml(self, xml: str):
+        return RecordedDocument(xml)
+
+    @timed
+    def set_attribute(self, document, key: str, value: str):
+        # a new document, the recorded notifications keep their own content
+        return document.patched(key, value)
+
+    @timed
+    def create_notification(self, document):
+        return RecordedNotification(document)
+
+    @timed
+    def create_notification_data(self, values: dict, sequence_number: int = 0):
+        return RecordedData(values, sequence_number)
+
+    @timed
+    def create_scheduled_notification(self, document, delivery: dt.datetime):
+        notification = RecordedNotification(document)
+        notification.delivery_time = delivery
+        return notification
+
+    @timed
+    def create_toast_notifier(self, app_id: str, user = None):
+        return RecordedNotifier(self, app_id, user)
+
+    def history(self, user = None):
+        return self._history
+
+    def get_template_content(self, number: int):
+        return RecordedDocument("<toast><visual><binding template='ToastGeneric'>"
+                                "<text id='1' /></binding></visual></toast>")
+
+    def activated(self, event) -> tuple[str, dict]:
+        return event.arguments, dict(event.inputs)
+
+    def dismissed(self, event) -> int:
+        return event.reason
+
+    def failed(self, event) -> int:
+        return event.error
+
+    # event simulation, by default on the last shown notification
+    def activate(self, index: int = -1, arguments: str = "", **inputs):
+        return self.shown[index].fire("activated", RecordedEvent(arguments=arguments, inputs=inputs))
+
+    def dismiss(self, index: int = -1, reason: int = 0):
+        return self.shown[index].fire("dismissed", RecordedEvent(reason=reason))
+
+    def fail(self, index: int = -1, error: int = -1):
+        return self.shown[index].fire("failed", RecordedEvent(error=error))
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Get count, total, mean and max duration (seconds) of every timed call
+        """
+        stats = dict()
+        for name, times in self.timings.items():
+            total = sum(times)
+            stats[name] = {"count": len(times), "total": total,
+                           "mean": total / len(times), "max": max(times)}
+        return stats
+
+    def reset(self):
+        self.shown.clear()
+        self.scheduled.clear()
+        self.updates.clear()
+        self.timings.clear()
+
+
+class RecordedDocument:
+
+    """
+    XmlDocument stand-in. The xml is checked to be well formed, like WinRT does.
+    """
+
+    def __init__(self, xml: str, root: xe.Element = None):
+        self.document_element = xe.fromstring(xml) if root is None else root
+        self._xml = xml
+
+    def get_xml(self) -> str:
+        if self._xml is None:
+            self._xml = xe.tostring(self.document_element, encoding="unicode")
+        return self._xml
+
+    def patched(self, key: str, value: str) -> RecordedDocument:
+        # shallow copy of the root, children are shared and never changed
+        root = self.document_element
+        twin = xe.Element(root.tag, root.attrib)
+        twin.text, twin.tail = root.text, root.tail
+        twin.extend(root)
+        twin.set(key, value)
+        return RecordedDocument(None, twin)
+
+
+class RecordedEvent:
+
+    """
+    Event args stand-in for the simulated user events
+    """
+
+    def __init__(self, arguments: str = "", inputs: dict = None, reason: int = 0, error: int = 0):
+        self.arguments = arguments
+        self.inputs = dict() if inputs is None else inputs
+        self.reason = reason
+        self.error = error
+
+
+class RecordedData:
+
+    """
+    NotificationData stand-in
+    """
+
+    def __init__(self, values: dict, sequence_number: int = 0):
+        self.values = {key: str(value) for key, value in values.items()}
+        self.sequence_number = sequence_number
+
+    def __repr__(self):
+        return f"<RecordedData #{self.sequence_number} {self.values}>"
+
+
+class RecordedToken:
+
+    def __init__(self, value: int):
+        self.value = value
+
+
+class RecordedNotification:
+
+    """
+    ToastNotification stand-in
+    """
+
+    def __init__(self, content: RecordedDocument):
+        self.content = content
+        self.tag = ""
+        self.group = ""
+        self.data = None
+        self.priority = 0
+        self.handlers = {"activated": dict(), "dismissed": dict(), "failed": dict()}
+        self._tokens = 0
+
+    def _add(self, kind: str, handler) -> RecordedToken:
+        self._tokens += 1
+        self.handlers[kind][self._tokens] = handler
+        return RecordedToken(self._tokens)
+
+    def add_activated(self, handler):
+        return self._add("activated", handler)
+
+    def add_dismissed(self, handler):
+        return self._add("dismissed", handler)
+
+    def add_failed(self, handler):
+        return self._add("failed", handler)
+
+    def remove_activated(self, token: RecordedToken):
+        self.handlers["activated"].pop(token.value, None)
+
+    def remove_dismissed(self, token: RecordedToken):
+        self.handlers["dismissed"].pop(token.value, None)
+
+    def remove_failed(self, token: RecordedToken):
+        self.handlers["failed"].pop(token.value, None)
+
+    def fire(self, kind: str, event: RecordedEvent) -> list:
+        """
+        Call the subscribed handlers as WinRT would do
+        """
+        return [handler(self, event) for handler in list(self.handlers[kind].values())]
+
+
+class RecordedNotifier:
+
+    """
+    ToastNotifier stand-in
+    """
+
+    def __init__(self, backend: RecordingBackend, app_id: str, user = None):
+        self.backend = backend
+        self.app_id = app_id
+        self.user = user
+
+    @timed
+    def show(self, notification: RecordedNotification):
+        notification.app_id = self.app_id
+        self.backend.shown.append(notification)
+
+    @timed
+    def hide(self, notification: RecordedNotification):
+        if notification in self.backend.shown:
+            self.backend.shown.remove(notification)
+
+    @timed
+    def add_to_schedule(self, notification: RecordedNotification):
+        notification.app_id = self.app_id
+        self.backend.scheduled.append(notification)
+
+    def remove_from_schedule(self, notification: RecordedNotification):
+        if notification in self.backend.scheduled:
+            self.backend.scheduled.remove(notification)
+
+    def get_scheduled_toast_notifications(self) -> list[RecordedNotification]:
+        return [n for n in self.backend.scheduled if n.app_id == self.app_id]
+
+    @timed
+    def update(self, data, tag: str, group: str = ""):
+        self.backend.updates.append((self.app_id, data, tag, group))
+        # NotificationUpdateResult: 0 succeeded, 2 notification not found
+        for notification in self.backend.shown:
+            if (notification.app_id, notification.tag, notification.group) == (self.app_id, tag, group):
+                # stale sequence numbers are ignored, like Windows does
+                current = notification.data
+                if current is None or data.sequence_number == 0 or \
+                        data.sequence_number > current.sequence_number:
+                    notification.data = data
+                return 0
+        return 2
+
+
+class RecordedHistory:
+
+    """
+    ToastNotificationHistory stand-in, it works on the shown notifications
+    """
+
+    def __init__(self, backend: RecordingBackend):
+        self.backend = backend
+
+    def get_history(self, app_id: str) -> list[RecordedNotification]:
+        return [n for n in self.backend.shown if n.app_id == app_id]
+
+    def _drop(self, app_id: str, match):
+        shown = self.backend.shown
+        shown[:] = [n for n in shown if n.app_id != app_id or not match(n)]
+
+    def remove(self, tag: str, group: str, app_id: str):
+        self._drop(app_id, lambda n: n.tag == tag and n.group == group)
+
+    def remove_group(self, group: str, app_id: str):
+        self._drop(app_id, lambda n: n.group == group)
+
+    def clear(self, app_id: str):
+        self._drop(app_id, lambda n: True)
+
+
+
+
+class Assets:
+
+    """
+    Resolve image and icon paths to absolute file:/// uris.
+    Relative paths are searched in the configured roots, in the working directory
+    and then in the package folder (where the bundled icons are).
+    Results are kept in a bounded LRU cache: a cached file is stat-ed again only
+    after 'recheck' seconds and resolved again if it changed or disappeared.
+    """
+
+    PACKAGE: str = os.path.dirname(os.path.abspath(__file__))
+    SCHEMES: tuple = ("http://", "https://", "ms-appx:", "ms-appdata:", "file:")
+
+    roots: list[str] = list()
+    size: int = 512
+    recheck: float = 5.0
+
+    # key -> [uri, file path, mtime, last check]
+    _cache: cl.OrderedDict = cl.OrderedDict()
+    _lock = th.Lock()
+
+    @classmethod
+    def resolve(cls, path: str) -> str | None:
+        """
+        Get the uri of an image/icon, None if the file is missing.
+        Remote and app uris are returned as they are.
+        """
+        if path.startswith(cls.SCHEMES):
+            return path
+        return cls._entry(path)[0]
+
+    @classmethod
+    def find(cls, path: str) -> str | None:
+        """
+        Get the absolute file path of a local image/icon, None if missing
+        """
+        return None if path.startswith(cls.SCHEMES) else cls._entry(path)[1]
+
+    @classmethod
+    def _entry(cls, path: str) -> list:
+        key = path if os.path.isabs(path) else (path, os.getcwd())
+        now = tm.monotonic()
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is not None:
+                cls._cache.move_to_end(key)
+                if now - entry[3] < cls.recheck:
+                    return entry
+        # first time or check due: one stat if nothing changed
+        if entry is not None and entry[1] is not None:
+            try:
+                fresh = os.stat(entry[1]).st_mtime == entry[2]
+            except OSError:
+                fresh = False
+            if fresh:
+                entry[3] = now
+                return entry
+        entry = [*cls._locate(path), now]
+        with cls._lock:
+            cls._cache[key] = entry
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls.size:
+                cls._cache.popitem(last=False)
+        return entry
+
+    @classmethod
+    def _locate(cls, path: str) -> tuple:
+        folders = ("",) if os.path.isabs(path) else (*cls.roots, os.getcwd(), cls.PACKAGE)
+        for folder in folders:
+            location = os.path.abspath(os.path.join(folder, path))
+            try:
+                mtime = os.stat(location).st_mtime
+            except OSError:
+                continue
+            if os.path.isfile(location):
+                return pl.Path(location).as_uri(), location, mtime
+        return None, None, None
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+
+
+
+class ImageCache:
+
+    """
+    Ready-sized images for toasts (optional, needs Pillow: pip install tosted[images]).
+    A source image is resized and cropped to its placement size at the wanted scale,
+    then written to a disk cache keyed by the hash of its content and settings, so the
+    shell loads a small image instead of scaling a multi-megabyte file at every toast.
+    The cache keeps within 'budget' bytes dropping the least recently used files,
+    the folder is scanned only when a new file may have pushed it over.
+    Rendered files are kept under LIMIT bytes, Windows does not show bigger ones.
+
+    Sizes at 100% scale:    logo 48x48, hero 364x180, inline 364x180
+    Scale factors:          100, 125, 150, 200, 400
+    """
+
+    SIZES: dict = {"logo": (48, 48), "appLogoOverride": (48, 48), "hero": (364, 180), "inline": (364, 180)}
+    SCALES: tuple = (100, 125, 150, 200, 400)
+    LIMIT: int = 200 * 1024     # smallest size limit Windows ever applied to toast images
+    KNOWN: int = 1024           # sources remembered by path, see _prepare
+    TOUCH: float = 60.0         # seconds between the mtime refreshes of a used file
+
+    def __init__(self, folder: str = None, budget: int = 64 * 1024 * 1024):
+        self.folder = os.path.join(tf.gettempdir(), "toasted-images") if folder is None else folder
+        self.budget = budget
+        # (path, mtime, size, settings) -> [cached file, last mtime refresh], skips hashing unchanged sources
+        self._known: cl.OrderedDict[tuple, list] = cl.OrderedDict()
+        self._total = None      # bytes in the folder as of the last trim plus the files written since
+        self._written = 0       # files rendered by this cache
+        os.makedirs(self.folder, exist_ok=True)
+
+    def prepare(self, source: str, placement: str = "inline", scale: int = 100, crop: bool = True) -> str:
+        """
+        Get the path of the ready-sized image, processing the source on a cache miss
+        """
+        written = self._written
+        target = self._prepare(source, placement, scale, crop)
+        if self._written != written and (self._total is None or self._total > self.budget):
+            self.trim()
+        return target
+
+    def batch(self, sources: list[str], placement: str = "inline", scale: int = 100,
+              crop: bool = True, workers: int = None) -> list[str]:
+        """
+        Prepare many images in a process pool, return the cached paths in order
+        """
+        # imported here: only batches need it, and it is slow to import
+        import concurrent.futures as cf
+        jobs = [(self.folder, source, placement, scale, crop) for source in sources]
+        with cf.ProcessPoolExecutor(workers) as pool:
+            targets = list(pool.map(ImageCache.work, jobs))
+        self.trim()
+        return targets
+
+    @staticmethod
+    def work(job: tuple) -> str:
+        # process pool entry point
+        folder, source, placement, scale, crop = job
+        return ImageCache(folder)._prepare(source, placement, scale, crop)
+
+    def _prepare(self, source: str, placement: str, scale: int, crop: bool) -> str:
+        if placement not in ImageCache.SIZES:
+            raise ValueError(f"unknown placement {placement!r}, use one of {', '.join(ImageCache.SIZES)}")
+        if scale not in ImageCache.SCALES:
+            raise ValueError(f"unsupported scale {scale}, use one of {ImageCache.SCALES}")
+        source = os.path.abspath(source)
+        info = os.stat(source)
+        settings = f"{placement}|{scale}|{crop}"
+        known = source, info.st_mtime, info.st_size, settings
+        now = tm.monotonic()
+        entry = self._known.get(known)
+        if entry is not None and os.path.isfile(entry[0]):
+            self._known.move_to_end(known)
+            # recently used files survive the trim, a coarse mtime is enough for that
+            if now - entry[1] >= ImageCache.TOUCH:
+                os.utime(entry[0])
+                entry[1] = now
+            return entry[0]
+        with open(source, "rb") as file:
+            content = file.read()
+        key = hl.sha256(content + settings.encode()).hexdigest()[:32]
+        target = os.path.join(self.folder, key + ".png")
+        if os.path.isfile(target):
+            os.utime(target)
+        else:
+            self.render(content, target, ImageCache.SIZES[placement], scale, crop)
+            self._written += 1
+            if self._total is not None:
+                self._total += os.path.getsize(target)
+        self._known[known] = [target, now]
+        while len(self._known) > ImageCache.KNOWN:
+            self._known.popitem(last=False)
+        return target
+
+    @staticmethod
+    def render(content: bytes, target: str, size: tuple[int, int], scale: int, crop: bool):
+        """
+        Resize (and crop) the image to the size at the scale and write it as png.
+        A file over LIMIT is written again with a 256 color palette, then smaller.
+        """
+        try:
+            from PIL import Image, ImageOps
+        except ImportError as error:
+            raise ImportError("image preprocessing needs Pillow: pip install tosted[images]") from error
+        width, height = (round(side * scale / 100) for side in size)
+        with Image.open(io.BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image).convert("RGBA")
+            if crop:
+                image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+            else:
+                image.thumbnail((width, height), Image.LANCZOS)
+            # written aside and moved, concurrent workers never see half files
+            partial = f"{target}.{os.getpid()}.part"
+            image.save(partial, "PNG", optimize=True)
+            if os.path.getsize(partial) > ImageCache.LIMIT:
+                image = image.quantize(256, method=Image.FASTOCTREE)
+                image.save(partial, "PNG", optimize=True)
+            while os.path.getsize(partial) > ImageCache.LIMIT and min(image.size) > 1:
+                image = image.resize((image.width * 3 // 4 or 1, image.height * 3 // 4 or 1), Image.NEAREST)
+                image.save(partial, "PNG", optimize=True)
+        os.replace(partial, target)
+
+    def trim(self) -> int:
+        """
+        Drop the least recently used files over the budget, return how many
+        """
+        files = list()
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith(".png"):
+                info = entry.stat()
+                files.append((info.st_mtime, info.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.budget:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._total = total
+        return removed
 
 
 
@@ -284,6 +1817,13 @@ class Audio(str):
 
     SAMPLES = *SAMPLES_1, *SAMPLES_2, *SAMPLES_3
 
+    # full names, in the SAMPLES order
+    URIS = (*map((ROOT + RPATH).__add__, SAMPLES_1),
+            *map((ROOT + LPATH).__add__, SAMPLES_2 + SAMPLES_3))
+
+    # case-insensitive index built once: sample name -> full name
+    INDEX = dict(zip(map(str.lower, SAMPLES), URIS))
+
     def __new__(cls, path: str = ""):
         path = cls.abspath(path)
         return None if path is None else str.__new__(cls, path)
@@ -294,28 +1834,45 @@ class Audio(str):
 
     @staticmethod
     def listaudio():
-        for i,s in enumerate(Audio.SAMPLES):
-            audiotype = Audio.RPATH if i <= 4 else Audio.LPATH
-            audio = Audio.ROOT + audiotype + s
-            yield audio
+        yield from Audio.URIS
 
 
     @staticmethod
     def abspath(path: str):
-        abs_audiopath = None
-        # get abs file path if is a file
-        if os.path.isfile(path):
-            abs_audiopath = os.path.abspath(path)
-        else:
-            # otherwise search for default win audios
-            path = path.split(".")[-1].lower()
-            for default_path in Audio.listaudio():
-                default_name = default_path.split(".")[-1].lower()
-                if path == default_name:
-                    abs_audiopath = default_path
-                    break
+        # default win audios: short name or full name, no file system access
+        name = path.split(".")[-1].lower()
+        abs_audiopath = Audio.INDEX.get(name)
+        # otherwise get abs file path if is a file
+        if abs_audiopath is None:
+            abs_audiopath = Audio.locate(path)
         return abs_audiopath
 
+    # custom audio files, see locate: key -> (absolute path or None, last check)
+    size: int = 256
+    recheck: float = 5.0
+    _found: cl.OrderedDict = cl.OrderedDict()
+    _lock = th.Lock()
+
+    @staticmethod
+    def locate(path: str):
+        """
+        Get the absolute path of a custom audio file, None if missing.
+        Results are kept by path and working directory, and looked up again
+        after 'recheck' seconds, as Assets does.
+        """
+        key = path if os.path.isabs(path) else (path, os.getcwd())
+        now = tm.monotonic()
+        with Audio._lock:
+            entry = Audio._found.get(key)
+        if entry is None or now - entry[1] >= Audio.recheck:
+            entry = (os.path.abspath(path) if os.path.isfile(path) else None), now
+            with Audio._lock:
+                Audio._found[key] = entry
+                Audio._found.move_to_end(key)
+                while len(Audio._found) > Audio.size:
+                    Audio._found.popitem(last=False)
+        return entry[0]
+
 
     @classmethod
     def ring(cls, number: int = 1):
@@ -363,6 +1920,498 @@ class Audio(str):
 
 
 
+class ValidationError(ValueError):
+
+    """
+    The toast document breaks the toast schema
+    """
+
+    def __init__(self, violations: list[str]):
+        super().__init__("invalid toast:\n  " + "\n  ".join(violations))
+        self.violations = violations
+
+
+class Schema:
+
+    """
+    Toast schema validator.
+    The declarative rules are compiled once into lookup tables, then a document is
+    checked in a single walk that reports every violation. Results are cached by the
+    structure of the document (see key), so toasts differing only in texts and free
+    values like timestamps or labels are checked once.
+
+    Rules by tag:
+        children:   allowed child tags
+        max:        most children per tag; 'tag@placement' counts only that placement
+        required:   mandatory attributes
+        values:     allowed attribute values
+        refers:     attribute -> kind of id it must point to
+        declares:   kind of id the 'id' attribute declares
+    """
+
+    STYLES = ("default", "caption", "captionSubtle", "body", "bodySubtle", "base", "baseSubtle",
+              "subtitle", "subtitleSubtle", "title", "titleSubtle", "titleNumeral",
+              "subheader", "subheaderSubtle", "subheaderNumeral",
+              "header", "headerSubtle", "headerNumeral")
+    ACTIVATIONS = ("foreground", "background", "protocol", "system")
+
+    RULES: dict[str, dict] = {
+        "toast": {"children": ("visual", "actions", "audio", "header"),
+                  "max": {"visual": 1, "actions": 1, "audio": 1, "header": 1},
+                  "values": {"scenario": ("default", "reminder", "alarm", "incomingCall", "urgent"),
+                             "duration": ("short", "long"),
+                             "activationType": ACTIVATIONS}},
+        "visual": {"children": ("binding",), "max": {"binding": 1}},
+        "binding": {"children": ("text", "image", "group", "progress"),
+                    "max": {"text": 4, "text@attribution": 1, "progress": 1},
+                    "required": ("template",)},
+        "group": {"children": ("subgroup",), "max": {"subgroup": 5}},
+        "subgroup": {"children": ("text", "image")},
+        "text": {"children": (),
+                 "values": {"hint-style": STYLES,
+                            "hint-align": ("default", "auto", "left", "center", "right"),
+                            "placement": ("attribution",)}},
+        "image": {"children": (), "required": ("src",),
+                  "values": {"placement": ("inline", "appLogoOverride", "hero"),
+                             "hint-crop": ("none", "circle"),
+                             "hint-removeMargin": ("true", "false")}},
+        "progress": {"children": (), "required": ("value", "status")},
+        "audio": {"children": (), "values": {"loop": ("true", "false"), "silent": ("true", "false")}},
+        "header": {"children": (), "required": ("id", "title", "arguments"),
+                   "values": {"activationType": ACTIVATIONS}},
+        "actions": {"children": ("input", "action"),
+                    "max": {"input": 5, "action": 5, "action@contextMenu": 5}},
+        "input": {"children": ("selection",), "max": {"selection": 5},
+                  "required": ("id", "type"), "declares": "input",
+                  "values": {"type": ("text", "selection"), "activationType": ACTIVATIONS},
+                  "refers": {"defaultInput": "selection"}},
+        "selection": {"children": (), "required": ("id", "content"), "declares": "selection"},
+        "action": {"children": (), "required": ("content", "arguments"),
+                   "values": {"activationType": ACTIVATIONS,
+                              "placement": ("contextMenu",),
+                              "hint-buttonStyle": ("Success", "Critical")},
+                   "refers": {"hint-inputId": "input"}},
+    }
+
+    def __init__(self, rules: dict[str, dict] = None, cache: int = 256):
+        rules = Schema.RULES if rules is None else rules
+        # compiled tables
+        self.children = {tag: frozenset(rule.get("children", ())) for tag, rule in rules.items()}
+        self.maxima = {tag: dict(rule.get("max", {})) for tag, rule in rules.items()}
+        self.required = {tag: tuple(rule.get("required", ())) for tag, rule in rules.items()}
+        self.values = {tag: {key: frozenset(allowed) for key, allowed in rule.get("values", {}).items()}
+                       for tag, rule in rules.items()}
+        self.refers = {tag: tuple(rule.get("refers", {}).items()) for tag, rule in rules.items()}
+        self.declares = {tag: rule["declares"] for tag, rule in rules.items() if "declares" in rule}
+        # attributes whose values the rules read, the only values in the cache key
+        self.checked = {tag: tuple(sorted({*self.values[tag], "placement", *(key for key, _ in self.refers[tag]),
+                                           *(("id",) if tag in self.declares else ())}))
+                        for tag in rules}
+        self.size = cache
+        self._cache = cl.OrderedDict()
+        self._lock = th.Lock()
+
+    _default = None
+
+    @staticmethod
+    def default() -> Schema:
+        if Schema._default is None:
+            Schema._default = Schema()
+        return Schema._default
+
+    def validate(self, root: xe.Element) -> list[str]:
+        """
+        Get all the violations of the document, in one walk
+        """
+        violations = list()
+        ids: dict[str, set] = dict()
+        references = list()
+        stack = [(root, root.tag)]
+        if root.tag != "toast":
+            violations.append(f"{root.tag}: the root element must be 'toast'")
+        while stack:
+            node, path = stack.pop()
+            tag = node.tag
+            if tag not in self.children:
+                violations.append(f"{path}: unknown element")
+                continue
+            attrib = node.attrib
+            # attributes
+            for key in self.required[tag]:
+                if key not in attrib:
+                    violations.append(f"{path}: missing attribute '{key}'")
+            for key, allowed in self.values[tag].items():
+                value = attrib.get(key)
+                if value is not None and value not in allowed:
+                    violations.append(f"{path}: bad {key}={value!r}, use one of {', '.join(sorted(allowed))}")
+            kind = self.declares.get(tag)
+            if kind is not None and "id" in attrib:
+                declared = ids.setdefault(kind, set())
+                if attrib["id"] in declared and kind == "input":
+                    violations.append(f"{path}: duplicated id {attrib['id']!r}")
+                declared.add(attrib["id"])
+            for key, kind in self.refers[tag]:
+                if key in attrib:
+                    references.append((path, key, attrib[key], kind))
+            # children
+            allowed = self.children[tag]
+            counts = dict()
+            visit = list()
+            for index, child in enumerate(node):
+                child_path = f"{path}/{child.tag}[{index}]"
+                if child.tag not in allowed:
+                    violations.append(f"{child_path}: not allowed in '{tag}'")
+                    continue
+                counts[child.tag] = counts.get(child.tag, 0) + 1
+                placement = child.get("placement")
+                if placement is not None:
+                    key = f"{child.tag}@{placement}"
+                    counts[key] = counts.get(key, 0) + 1
+                visit.append((child, child_path))
+            # document order
+            stack.extend(reversed(visit))
+            for key, most in self.maxima[tag].items():
+                if counts.get(key, 0) > most:
+                    violations.append(f"{path}: {counts[key]} '{key}' elements, at most {most}")
+        # cross references, once all the ids are known
+        for path, key, value, kind in references:
+            if value not in ids.get(kind, ()):
+                violations.append(f"{path}: {key}={value!r} points to no {kind}")
+        return violations
+
+    def key(self, root: xe.Element) -> tuple:
+        """
+        Structural key of the document, in one walk: for every node its tag, number
+        of children, attribute names and the values of the attributes the rules check.
+        Documents with the same key have the same violations.
+        """
+        checked = self.checked
+        parts = list()
+        for node in root.iter():
+            parts.append((node.tag, len(node), tuple(node.keys()), tuple(map(node.get, checked.get(node.tag, ())))))
+        return tuple(parts)
+
+    def check(self, root: xe.Element) -> list[str]:
+        """
+        Validate with the cache, keyed by the structure of the document (see key).
+        Raise ValidationError listing every violation.
+        """
+        key = self.key(root)
+        with self._lock:
+            violations = self._cache.get(key)
+            if violations is not None:
+                self._cache.move_to_end(key)
+        if violations is None:
+            violations = self.validate(root)
+            with self._lock:
+                self._cache[key] = violations
+                while len(self._cache) > self.size:
+                    self._cache.popitem(last=False)
+        if violations:
+            raise ValidationError(violations)
+        return violations
+
+
+
+
+# the values the schema enumerates are fixed values of the drafts too
+Node.WORDS.update((word, word) for rule in Schema.RULES.values()
+                  for allowed in rule.get("values", {}).values() for word in allowed)
+
+
+
+
+class Store:
+
+    """
+    Opt-in local record of the sent toasts and of the user responses, in SQLite.
+    Writes are queued and a background thread commits them in batches, waiting
+    up to 'linger' seconds for a batch to fill, so recording costs a queue put
+    on the sending thread.
+    Enable it for every toast with: Toast.store = Store("toasts.db")
+    """
+
+    TABLE = """
+        CREATE TABLE IF NOT EXISTS toasts (
+            id INTEGER PRIMARY KEY,
+            ref TEXT,
+            app_id TEXT, user TEXT, tag TEXT, grp TEXT,
+            sent REAL, answered REAL, response TEXT, arguments TEXT, inputs TEXT,
+            xml BLOB)"""
+    INDEXES = ("CREATE INDEX IF NOT EXISTS toasts_ref ON toasts (ref)",
+               "CREATE INDEX IF NOT EXISTS toasts_app ON toasts (app_id, sent)",
+               "CREATE INDEX IF NOT EXISTS toasts_tag ON toasts (tag, sent)",
+               "CREATE INDEX IF NOT EXISTS toasts_grp ON toasts (grp, sent)",
+               "CREATE INDEX IF NOT EXISTS toasts_sent ON toasts (sent)")
+    INSERT = "INSERT INTO toasts (ref, app_id, user, tag, grp, sent, xml) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    ANSWER = "UPDATE toasts SET answered = ?, response = ?, arguments = ?, inputs = ? WHERE ref = ?"
+    COLUMNS = ("id", "ref", "app_id", "user", "tag", "grp", "sent", "answered", "response", "arguments", "inputs")
+
+    def __init__(self, path: str = ":memory:", batch: int = 256, linger: float = 0.05, size: int = 65536):
+        self.path = path
+        self.batch = batch
+        self.linger = linger
+        self.queue = qu.Queue(size)
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self._lock = th.Lock()
+        # shared by the writer and the queries, always under the lock
+        self._db = sq.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        with self._lock, self._db:
+            self._db.execute(Store.TABLE)
+            for index in Store.INDEXES:
+                self._db.execute(index)
+        # references are given here, so a response can be queued before its row is written;
+        # the random prefix keeps them apart from other stores on the same file
+        self._prefix = os.urandom(6).hex()
+        self._refs = it.count(1)
+        self._thread = th.Thread(target=self._work, name="toasted-store", daemon=True)
+        self._thread.start()
+
+    def record(self, xml: str, app_id: str, tag: str = "", group: str = "", user = None) -> str | None:
+        """
+        Queue a sent toast, return its reference (None if the queue was full)
+        """
+        key = f"{self._prefix}:{next(self._refs)}"
+        user = None if user is None else str(user)
+        if self._put((Store.INSERT, (key, app_id, user, tag, group, tm.time(), xml))):
+            return key
+        return None
+
+    def answer(self, key: str, event: Event):
+        """
+        Queue the user response to a recorded toast
+        """
+        inputs = None if event.inputs is None else js.dumps(event.inputs)
+        self._put((Store.ANSWER, (event.time, event.kind, event.arguments, inputs, key)))
+
+    def _put(self, job) -> bool:
+        try:
+            self.queue.put_nowait(job)
+        except qu.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _work(self):
+        while True:
+            jobs = [self.queue.get()]
+            deadline = tm.monotonic() + self.linger
+            while len(jobs) < self.batch and jobs[-1][0] is not None:
+                try:
+                    jobs.append(self.queue.get(timeout=max(deadline - tm.monotonic(), 0)))
+                except qu.Empty:
+                    break
+            try:
+                with self._lock, self._db:
+                    for sql, values in jobs:
+                        if sql is None:
+                            continue
+                        if sql is Store.INSERT:
+                            # compressed here, away from the sending thread
+                            values = values[:-1] + (zl.compress(values[-1].encode()),)
+                        self._db.execute(sql, values)
+                    self.written += sum(sql is not None for sql, _ in jobs)
+                    self.batches += 1
+            except sq.Error:
+                # the batch is rolled back, the writer goes on
+                with self._lock:
+                    self.errors += 1
+            finally:
+                for _ in jobs:
+                    self.queue.task_done()
+            if any(sql is None for sql, _ in jobs):
+                return
+
+    def flush(self):
+        """
+        Wait until every queued write is committed
+        """
+        self.queue.join()
+
+    def close(self):
+        """
+        Commit what is queued, then stop the writer and close the database
+        """
+        if self._thread.is_alive():
+            self.queue.put((None, None))
+            self._thread.join()
+        self._db.close()
+
+    def query(self, app_id: str = None, tag: str = None, group: str = None,
+              since: float = None, until: float = None, limit: int = 100) -> list[dict]:
+        """
+        Get the latest recorded toasts, newest first, filtered by the given fields.
+        Times are seconds since the epoch. Queued writes are committed first.
+        """
+        self.flush()
+        clauses, values = list(), list()
+        for column, value in (("app_id", app_id), ("tag", tag), ("grp", group)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                values.append(value)
+        if since is not None:
+            clauses.append("sent >= ?")
+            values.append(since)
+        if until is not None:
+            clauses.append("sent < ?")
+            values.append(until)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        sql = f"SELECT {', '.join(Store.COLUMNS)} FROM toasts{where} ORDER BY sent DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*values, limit)).fetchall()
+        records = [dict(zip(Store.COLUMNS, row)) for row in rows]
+        for record in records:
+            if record["inputs"] is not None:
+                record["inputs"] = js.loads(record["inputs"])
+        return records
+
+    def xml(self, key: int | str) -> str | None:
+        """
+        Get the xml of a recorded toast, by id or reference
+        """
+        self.flush()
+        column = "ref" if isinstance(key, str) else "id"
+        with self._lock:
+            row = self._db.execute(f"SELECT xml FROM toasts WHERE {column} = ?", (key,)).fetchone()
+        return None if row is None else zl.decompress(row[0]).decode()
+
+    def stats(self) -> dict[str, int]:
+        return {"written": self.written, "dropped": self.dropped, "errors": self.errors,
+                "batches": self.batches, "queued": self.queue.qsize()}
+
+    def __repr__(self):
+        return f"<Store {self.path!r}: {self.written} written, {self.queue.qsize()} queued>"
+
+
+
+
+class Probe:
+
+    """
+    Timing of every stage of toast delivery, aggregated in histograms.
+        build:          Toast init, the document setup (correct included)
+        correct:        Toast.correct
+        serialize:      xml string of the tree (scenario rules included)
+        validate:       Schema check
+        load_xml:       XmlDocument from the string
+        notification:   ToastNotification and its event handlers
+        notifier:       notifier of the app (NotifierPool)
+        show:           ToastNotifier.show
+        send:           the whole Toast.send
+    Enable it with: Toast.probe = Probe(). While Toast.probe is None the stages
+    only check it. Callbacks get (stage, seconds, toast) on the thread that sends;
+    toast is None for 'correct', which runs before the toast is set up.
+    """
+
+    STAGES = ("build", "correct", "serialize", "validate", "load_xml", "notification", "notifier", "show", "send")
+    # upper bounds of the histogram buckets, in seconds
+    BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+               0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    def __init__(self, buckets: tuple = BUCKETS, clock = tm.perf_counter):
+        self.buckets = tuple(buckets)
+        self.clock = clock
+        self.callbacks = list()
+        self._lock = th.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # stage -> counts per bucket, the last one is +Inf
+            self.counts = {stage: [0] * (len(self.buckets) + 1) for stage in Probe.STAGES}
+            self.sums = dict.fromkeys(Probe.STAGES, 0.0)
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def record(self, stage: str, seconds: float, toast: Toast = None):
+        index = bs.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self.counts.get(stage)
+            if counts is None:
+                counts = self.counts[stage] = [0] * (len(self.buckets) + 1)
+                self.sums[stage] = 0.0
+            counts[index] += 1
+            self.sums[stage] += seconds
+        for callback in self.callbacks:
+            callback(stage, seconds, toast)
+
+    def lap(self, stage: str, start: float, toast: Toast = None) -> float:
+        """
+        Record the time from 'start' to now, return now for the next stage
+        """
+        now = self.clock()
+        self.record(stage, now - start, toast)
+        return now
+
+    def quantile(self, stage: str, q: float) -> float | None:
+        """
+        Upper bound of the bucket holding the q quantile (None if no samples, inf if beyond the buckets)
+        """
+        with self._lock:
+            counts = list(self.counts.get(stage, ()))
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        for bound, running in zip((*self.buckets, float("inf")), it.accumulate(counts)):
+            if running >= rank:
+                return bound
+        return float("inf")
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        result = dict()
+        for stage, counts in list(self.counts.items()):
+            count = sum(counts)
+            if count:
+                result[stage] = {"count": count, "mean": self.sums[stage] / count,
+                                 "p50": self.quantile(stage, 0.5), "p99": self.quantile(stage, 0.99)}
+        return result
+
+    def prometheus(self, name: str = "toasted_stage_seconds") -> str:
+        """
+        Histograms in the Prometheus text format
+        """
+        lines = [f"# HELP {name} Time spent in each stage of toast delivery.",
+                 f"# TYPE {name} histogram"]
+        with self._lock:
+            snapshot = [(stage, list(counts), self.sums[stage]) for stage, counts in self.counts.items()]
+        for stage, counts, total in snapshot:
+            bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+            for bound, running in zip(bounds, it.accumulate(counts)):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {running}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {sum(counts)}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, name: str = "toasted_stage_seconds"):
+        """
+        Write the histograms for the textfile collector of the node exporter.
+        The file is replaced in one step, so the collector never reads half of it.
+        """
+        folder = os.path.dirname(os.path.abspath(path))
+        with tf.NamedTemporaryFile("w", dir=folder, suffix=".tmp", delete=False, encoding="utf-8") as file:
+            file.write(self.prometheus(name))
+        os.replace(file.name, path)
+
+    def __repr__(self):
+        counts = {stage: sum(counts) for stage, counts in self.counts.items() if sum(counts)}
+        return f"<Probe {counts}>"
+
+
+
+
 class Toast:
 
     """
@@ -383,41 +2432,131 @@ class Toast:
     DURATION_SHORT: str = "short" # 7 seconds
     DURATION_LONG: str = "long" # permanent
 
+    # documents are checked before reaching the backend, None to skip it
+    schema: Schema | None = Schema.default()
+    # sent toasts and responses are recorded here when set, see Store
+    store: Store | None = None
+    # node class of the builders (Toast.Text, Toast.Button...), see Draft
+    node: type = Element
+    # stage timings of building and sending when set, see Probe
+    probe: Probe | None = None
+    # last formatted second, see isotime
+    _now: tuple = (None, "")
+
     # TODO  spostate le icone
 
+    # instance state in slots: no per toast dict. Event and data containers are
+    # made on first use, most toasts never get handlers, waiters or data
+    __slots__ = ("_xml", "_wxml", "_stored", "id", "group", "tag", "_data", "seq_number",
+                 "event_args", "event_input", "event", "_waiters", "_handlers",
+                 "priority", "exipire_on_reboot", "exipire_on_time", "app_id", "backend", "user")
 
-    def __init__(self, document = None, app_id: str = "Python"):
+
+    def __init__(self, document = None, app_id: str = "Python", backend: Backend = None, user = None):
+        probe = Toast.probe
+        start = probe.clock() if probe is not None else 0.0
         # init the main document content
-        # TODO init should be manage simple empty tree
-        xmltree = Toast.correct(document) if isinstance(document, Tree) else Tree("toast")
-        self.xml = xmltree
+        if isinstance(document, Tree):
+            xmltree = Toast.correct(document)
+            if probe is not None:
+                probe.lap("correct", start)
+        else:
+            xmltree = Tree(Element(Toast.ROOT))
+        self._xml = xmltree
+        self._wxml = None       # cached (tree revision, backend, document, xml string), see Wxml
+        self._stored = None     # reference of the last send in the Store, if any
 
 
 
-        # default toast settings functionality
-        self.xml.set(self.ROOT, "launch", "http:")
-        self.xml.set(self.ROOT, "activationType", "protocol")
-        self.timestamp()
+        # default toast settings functionality, set on the root in one go
+        root = xmltree.root
+        root.attrib.update(launch="http:", activationType="protocol", displayTimestamp=Toast.isotime())
 
         # self.xml.set("scenario", "incomingCall") # fa una breve musichetta tipo suoneria
 
         self.id = 0             # id number is needed when you want to group similar toasts
         self.group = ""         # unique identification toast group name string
         self.tag = ""           # unique identification toast tag family within a group
-        self.data = dict()      # keys and values that could be updated in binding type toast
+        self._data = None       # keys and values that could be updated in binding type toast, see data
         self.seq_number = 0     # progressive number used to determine whether the notification data is out-of-date
 
 
         self.event_args = None
         self.event_input = None
+        self.event = None       # last user response, see Event
+        self._waiters = None    # callables waiting for the next response
+        self._handlers = None   # event kind -> user handlers, run by the Dispatcher
 
 
         self.priority = Toast.PRIORITY_LOW
         self.exipire_on_reboot = False
         self.exipire_on_time = 1200
-        self.manager = wn.ToastNotificationManager
         self.app_id: str = "Python" if app_id is None else app_id
+        self.backend = backend  # None means the process wide one
+        self.user = user        # None means the current user
+        if probe is not None:
+            probe.lap("build", start, self)
+
+
+    @property
+    def manager(self) -> Backend:
+        """
+        Get the notification backend (WinRT by default, loads winsdk on first use)
+        """
+        return Backend.current() if self.backend is None else self.backend
+
+    @property
+    def data(self) -> dict:
+        """
+        Data bound values (see Toast.update), the dict is made on first use
+        """
+        if self._data is None:
+            self._data = dict()
+        return self._data
+
+    @data.setter
+    def data(self, values: dict):
+        self._data = values
+
+    def clone(self) -> Toast:
+        """
+        Get a new toast with the same content and settings.
+        The xml tree is copied (see Tree.clone): edits of the clone never reach this toast.
+        """
+        kind = type(self)
+        toast = kind.__new__(kind)
+        for name in Toast.__slots__:
+            setattr(toast, name, getattr(self, name))
+        if hasattr(self, "__dict__"):
+            # subclasses without slots
+            toast.__dict__.update(self.__dict__)
+        toast._xml = self._xml.clone()
+        toast._wxml = None
+        toast._stored = None
+        toast._data = None if self._data is None else dict(self._data)
+        toast.event_args = None
+        toast.event_input = None
+        toast.event = None
+        toast._waiters = None
+        if self._handlers is not None:
+            toast._handlers = {kind: list(handlers) for kind, handlers in self._handlers.items()}
+        return toast
+
+
+    @property
+    def xml(self) -> Tree:
+        """
+        Get the xml tree.
+        Its edits are tracked (see Tree.revision) and refresh the cached document.
+        Plain xml.etree calls like xe.SubElement are not: call touch() on the
+        edited node afterwards.
+        """
+        return self._xml
 
+    @xml.setter
+    def xml(self, tree: Tree):
+        self._xml = tree
+        self._wxml = None
 
     @property
     def visual(self):
@@ -446,54 +2585,86 @@ class Toast:
         """
         Get buttons element
         """
-        button_list = list()
-        for action in self.actions:
-            if "type" not in action.attrib.keys():
-                button_list.append(action)
-        return button_list
+        return list(self.iterbuttons())
 
     @property
     def inputboxes(self):
         """
         Get inputboxes element
         """
-        input_list = list()
-        for action in self.actions:
-            if action.attrib.get("type") == "text":
-                input_list.append(action)
-        return input_list
+        return list(self.iterinputboxes())
 
     @property
     def selectionboxes(self):
         """
         Get selectionboxes element
         """
-        selection_list = list()
-        for action in self.actions:
-            if action.attrib.get("type") == "selection":
-                selection_list.append(action)
-        return selection_list
+        return list(self.iterselectionboxes())
+
+    def iterbuttons(self):
+        """
+        Iterate over the buttons, through the tree index
+        """
+        return self.xml.itertag("action")
+
+    def iterinputboxes(self):
+        """
+        Iterate over the text inputs, through the tree index
+        """
+        return (node for node in self.xml.itertag("input") if node.get("type") == "text")
+
+    def iterselectionboxes(self):
+        """
+        Iterate over the selection inputs, through the tree index
+        """
+        return (node for node in self.xml.itertag("input") if node.get("type") == "selection")
 
 
     @property
     def Wxml(self):
         """
-        Get Windows SDK XmlDocument class object
+        Get Windows SDK XmlDocument class object.
+        The document is cached: it is serialized again only after the tree changed
+        (see Tree.revision), validated (see Schema) and loaded only if the xml differs.
         """
-        xml_string = str(self.xml)
-        win_doc = wx.XmlDocument()
-        win_doc.load_xml(xml_string)
-        return win_doc
+        manager = self.manager
+        revision = self._xml.revision
+        cached = self._wxml
+        if cached is None or cached[0] != revision or cached[1] is not manager:
+            probe = self.probe
+            start = probe.clock() if probe is not None else 0.0
+            root = Toast.scenario(self._xml.root)
+            xml_string = xe.tostring(root, encoding="unicode")
+            if probe is not None:
+                start = probe.lap("serialize", start, self)
+            if cached is not None and cached[1] is manager and cached[3] == xml_string:
+                self._wxml = revision, manager, cached[2], xml_string
+                return cached[2]
+            if self.schema is not None:
+                self.schema.check(root)
+                if probe is not None:
+                    start = probe.lap("validate", start, self)
+            win_doc = manager.load_xml(xml_string)
+            if probe is not None:
+                probe.lap("load_xml", start, self)
+            self._wxml = revision, manager, win_doc, xml_string
+        return self._wxml[2]
 
 
     @property
     def notification(self) -> wn.ToastNotification:
         # create native notification from xml document
-        notification = wn.ToastNotification(self.Wxml)
+        document = self.Wxml
+        probe = self.probe
+        start = probe.clock() if probe is not None else 0.0
+        notification = self.manager.create_notification(document)
         # add activator type event
-        subscription = self.subscription
-        subs_number = notification.add_activated(subscription)
-        print(subs_number.value)
+        notification.add_activated(self.subscription)
+        # and the other user events
+        notification.add_dismissed(self.dismissal)
+        notification.add_failed(self.failure)
+        if probe is not None:
+            probe.lap("notification", start, self)
         return notification
 
 
@@ -503,13 +2674,8 @@ class Toast:
         When event happend, this function will be called in order
         to update Toast's event attributes
         """
-        # init the event function
-        listener = wn.ToastActivatedEventArgs._from
-        # and a cast factory function for win Object
-        to_string = lambda val: wf.IPropertyValue._from(val).get_string()
-        # get event contents
-        user_args = listener(user_response).arguments
-        user_inputs = listener(user_response).user_input
+        # get event contents through the backend
+        user_args, user_inputs = self.manager.activated(user_response)
         # set the event attributes
         # for the arguments
         if user_args != "":
@@ -517,13 +2683,55 @@ class Toast:
         else:
             self.event_args = None
         # and for the inputs
-        if user_inputs.size > 0:
-            self.event_input = {k: to_string(v) for k,v in user_inputs.items()}
+        if len(user_inputs) > 0:
+            self.event_input = user_inputs
         else:
             self.event_input = None
+        self.respond(Event.Activate(self, user_args, user_inputs))
         # return raw contents
         return notification, user_args, user_inputs
 
+    def dismissal(self, notification, user_response):
+        """
+        Handler function for the dismissed event
+        """
+        reason = self.manager.dismissed(user_response)
+        self.respond(Event.Dismiss(self, reason))
+        return notification, reason
+
+    def failure(self, notification, user_response):
+        """
+        Handler function for the failed event
+        """
+        error = self.manager.failed(user_response)
+        self.respond(Event.Fault(self, error))
+        return notification, error
+
+    def on(self, kind: str, handler):
+        """
+        Add a handler for the user events of this toast ('activated', 'dismissed', 'failed').
+        Handlers get the Event and run on the Dispatcher threads, not on the WinRT ones.
+        """
+        if self._handlers is None:
+            self._handlers = dict()
+        self._handlers.setdefault(kind, list()).append(handler)
+        return self
+
+    def respond(self, event: Event):
+        """
+        Store the user response and hand it to whoever is waiting for it.
+        It runs on the WinRT callback thread: handlers are only queued.
+        """
+        self.event = event
+        if self._stored is not None and self.store is not None:
+            self.store.answer(self._stored, event)
+        waiters, self._waiters = self._waiters or (), None
+        for waiter in waiters:
+            waiter(event)
+        dispatcher = Dispatcher.current()
+        if dispatcher.wanted(event):
+            dispatcher.put(event)
+
 
 
     @staticmethod
@@ -532,31 +2740,41 @@ class Toast:
         Check and dispose correctly elements in the xml tree.
         Some rule:
             1. in 'actions' node all 'input' child noded should be placed before all 'action' child nodes
+        An Actions node already keeps this order, a plain one is fixed here once.
+        The scenario rules are applied at serialization time, see scenario.
         """
         # 1. NODES MANDATORY SEQUENCE
         # 1.1 input first
-        actions_nodes = sorted(xml.findall("actions/"), key = lambda x: x.tag, reverse=True)
-        # get actions node with its attributes and text
         actions = xml.find("actions")
-        actions_attr = actions.attrib
-        actions_text = actions.text
-        # init actions node restoring attributes and text
-        actions.clear()
-        actions.attrib = actions_attr
-        actions.text = actions_text
-        # fill actions node with ordered 'input' and 'action'
-        for action in actions_nodes:
-            actions.append(action)
-        # 2. SCENARIOS RULES
-        # 2.1 in the incomingCall scenario toasts cannot use the colored buttons
-        root_node = xml.root
-        if root_node.attrib.get("scenario", None) == "incomingCall":
+        if actions is not None and not isinstance(actions, Actions):
+            children = list(actions)
+            ordered = [child for child in children if child.tag == "input"]
+            ordered.extend(child for child in children if child.tag != "input")
+            if ordered != children:
+                actions[:] = ordered
+        return xml
+
+    @staticmethod
+    def scenario(root: xe.Element) -> xe.Element:
+        """
+        Get the root node as it is sent, with the scenario rules applied.
+            2.1 in the incomingCall scenario toasts cannot use the colored buttons
+        The tree is never changed: when a rule applies the root is a shallow
+        copy of the node, sharing its children.
+        """
+        attributes = dict(root.items())
+        if root.get("scenario", None) == "incomingCall":
             # delete attribute for colored buttons if any
-            if "useButtonStyle" in root_node.attrib.keys():
-                del root_node.attrib["useButtonStyle"]
+            if attributes.pop("useButtonStyle", None) is None:
+                return root
+        elif attributes.get("useButtonStyle") != "true":
+            attributes["useButtonStyle"] = "true"
         else:
-            xml.set("./", "useButtonStyle", "true")
-        return xml
+            return root
+        twin = xe.Element(root.tag, attributes)
+        twin.text, twin.tail = root.text, root.tail
+        twin.extend(root)
+        return twin
 
 
 
@@ -602,50 +2820,73 @@ class Toast:
         """
         # TODO date appear instead time if recent
         time = dt.datetime.now() if datetime == "" else dt.datetime.fromisoformat(datetime)
-        stamp = time.strftime("%Y-%m-%dT%H:%M:%S") + timezone
-        self.xml.set(self.ROOT, "displayTimestamp", stamp)
+        stamp = Toast.isotime(time, timezone)
+        # an up to date cached document is patched instead of rebuilt
+        cached = self._wxml is not None and self._wxml[0] == self._xml.revision
+        self._xml.set(self.ROOT, "displayTimestamp", stamp)
+        if cached:
+            _, manager, win_doc, xml_string = self._wxml
+            win_doc = manager.set_attribute(win_doc, "displayTimestamp", stamp)
+            xml_string = re.sub(r'displayTimestamp="[^"]*"', f'displayTimestamp="{stamp}"', xml_string, count=1)
+            self._wxml = self._xml.revision, manager, win_doc, xml_string
         return time
 
 
     @staticmethod
-    def Section(tag: str, text: str = "", **attributes) -> Element:
+    def isotime(time: dt.datetime | str = "", timezone: str = "+00:00") -> str:
+        """
+        Get the displayTimestamp attribute value of a time (now by default)
+        """
+        if time == "":
+            # toasts are made many per second: the current second is formatted once
+            second = int(tm.time())
+            if Toast._now[0] != second:
+                Toast._now = second, tm.strftime("%Y-%m-%dT%H:%M:%S", tm.localtime(second))
+            return Toast._now[1] + timezone
+        if isinstance(time, str):
+            time = dt.datetime.now() if time == "" else dt.datetime.fromisoformat(time)
+        return time.strftime("%Y-%m-%dT%H:%M:%S") + timezone
+
+
+    @classmethod
+    def Section(cls, tag: str, text: str = "", **attributes) -> Element:
         """
         Create custom toast node
         """
-        section = Element(tag, text=text, **attributes)
+        section = cls.node(tag, text=text, **attributes)
         return section
 
 
 
-    @staticmethod
-    def Visual(**attributes) -> Element:
+    @classmethod
+    def Visual(cls, **attributes) -> Element:
         """
         Init the main node 'visual'
         """
-        visual = Toast.Section("visual", **attributes)
+        visual = cls.Section("visual", **attributes)
         return visual
 
-    @staticmethod
-    def Binding(*elements: Element, **attributes) -> Element:
+    @classmethod
+    def Binding(cls, *elements: Element, **attributes) -> Element:
         """
         Init the main node 'binding'
         """
-        binding = Toast.Section("binding", **attributes)
+        binding = cls.Section("binding", **attributes)
         binding.set("template", "ToastGeneric")
         binding.extend(elements)
         return binding
 
-    @staticmethod
-    def Actions(*elements: Element, **attributes) -> Element:
+    @classmethod
+    def Actions(cls, *elements: Element, **attributes) -> Element:
         """
-        Init the main node 'actions'
+        Init the main node 'actions', inputs are kept before the buttons
         """
-        actions = Toast.Section("actions", **attributes)
+        actions = Actions(**attributes) if cls.node is Element else cls.node("actions", **attributes)
         actions.extend(elements)
         return actions
 
-    @staticmethod
-    def Audio(source: str, loop: bool = False, silent: bool = False) -> Element:
+    @classmethod
+    def Audio(cls, source: str, loop: bool = False, silent: bool = False) -> Element:
         """
         Create the main node 'audio'
 
@@ -675,7 +2916,7 @@ class Toast:
 
         """
         # init the element
-        audio = Element("audio")
+        audio = cls.node("audio")
         # set default attributes
         sample = Audio(source)
         if sample is not None:
@@ -687,47 +2928,47 @@ class Toast:
             audio.set("silent", "true")
         return audio
 
-    @staticmethod
-    def Subgroup(*elements: Element, stacking: str = None, weight: int = 1) -> Element:
+    @classmethod
+    def Subgroup(cls, *elements: Element, stacking: str = None, weight: int = 1) -> Element:
         """
         Specifies vertical columns that can contain text and images.
         Subgroup are stackable:
             - bottom
             -
         """
-        subgroup = Element("subgroup")
+        subgroup = cls.node("subgroup")
         subgroup.set("hint-weight", str(weight))
         if stacking is not None:
             subgroup.set("hint-textStacking", stacking)
         subgroup.extend(elements)
         return subgroup
 
-    @staticmethod
-    def Group(*subgroups: Element) -> Element:
+    @classmethod
+    def Group(cls, *subgroups: Element) -> Element:
         """
         Semantically identifies that the content in the group must either be
         displayed as a whole, or not displayed if it cannot fit.
         Groups also allow creating multiple columns.
         """
-        group = Element("group")
+        group = cls.node("group")
         group.extend(subgroups)
         return group
 
-    @staticmethod
-    def Header(headerid: int = 0, title = "", **attributes) -> Element:
+    @classmethod
+    def Header(cls, headerid: int = 0, title = "", **attributes) -> Element:
         """
         Used to group notifications under headers in the Notification Center.
         """
         title = title if title != "" else "Python"
-        header = Element("header", **attributes)
+        header = cls.node("header", **attributes)
         header.set("activationType", "protocol")
         header.set("id", f"{headerid:0>4}")
         header.set("title", title)
         header.set("arguments", "returned_arguments")
         return header
 
-    @staticmethod
-    def Text(txt: str, rich: bool = True,
+    @classmethod
+    def Text(cls, txt: str, rich: bool = True,
              align: str = "default", style: str = "default", minline: int = 1, maxline: int = 2,
              attribution: bool = False, **attributes):
         """
@@ -783,7 +3024,7 @@ class Toast:
         More on:    learn.microsoft.com/en-us/windows/apps/design/
                     shell/tiles-and-notifications/toast-schema#adaptivetext
         """
-        text = Toast.Section("text", text=txt, **attributes)
+        text = cls.Section("text", text=txt, **attributes)
         # attribution text type
         if attribution is True:
             text.set("placement", "attribution")
@@ -795,20 +3036,21 @@ class Toast:
 
 
 
-    @staticmethod
-    def Button(label: str, color: str = None, icon: str = None, tip: str = None, inputbox: str = None) -> Element:
+    @classmethod
+    def Button(cls, label: str, color: str = None, icon: str = None, tip: str = None, inputbox: str = None) -> Element:
         """
         Button
         """
         # TODO sembra che tutto si incentrato in una sorta di registrazione app in windows
         # struttata per avviare e comunicare con l app.
-        button = Element("action")
+        button = cls.node("action")
         button.set("activationType", "protocol")
         button.set("content", label)
         button.set("arguments", f"http:{label}")
         # add icon on button (max 16x16 no padding)
-        if icon is not None and os.path.isfile(icon):
-            button.set("imageUri", rf"file:///{icon}" )
+        icon = None if icon is None else Assets.resolve(icon)
+        if icon is not None:
+            button.set("imageUri", icon)
         # apply help tip when overing
         if tip is not None:
             button.set("hint-toolTip", tip)
@@ -823,26 +3065,26 @@ class Toast:
             button.set("hint-inputId", inputbox)
         return button
 
-    @staticmethod
-    def ButtonPospone(*button_arg, duration: str | Element = None, **button_kargs) -> Element:
+    @classmethod
+    def ButtonPospone(cls, *button_arg, duration: str | Element = None, **button_kargs) -> Element:
         """
         System Pospone Button.
         """
-        pospone = Toast.Button("Snooze", *button_arg, **button_kargs)
+        pospone = cls.Button("Snooze", *button_arg, **button_kargs)
         pospone.set("content", "")
         pospone.set("activationType", "system")
         pospone.set("arguments", "snooze")
         if duration is not None:
-            time = duration.get("id") if isinstance(duration, Element) else None
+            time = duration.get("id") if isinstance(duration, (Element, Node)) else None
             pospone.set("hint-inputId", time)
         return pospone
 
-    @staticmethod
-    def ButtonDismiss(*button_arg, **button_kargs) -> Element:
+    @classmethod
+    def ButtonDismiss(cls, *button_arg, **button_kargs) -> Element:
         """
         System Dismiss Button.
         """
-        dismiss = Toast.Button("Dismiss", *button_arg, **button_kargs)
+        dismiss = cls.Button("Dismiss", *button_arg, **button_kargs)
         dismiss.set("content", "")
         dismiss.set("activationType", "system")
         dismiss.set("arguments", "dismiss")
@@ -854,10 +3096,10 @@ class Toast:
         hint = "hint-" + f"{tag.lower()}{attribute.title()}"
         return hint
 
-    @staticmethod
-    def Context(command: str) -> Element:
+    @classmethod
+    def Context(cls, command: str) -> Element:
         # init the element
-        menu = Element("action")
+        menu = cls.node("action")
         # set default attributes
         menu.set("activationType", "protocol")
         menu.set("arguments", f"http:{command}")
@@ -866,8 +3108,9 @@ class Toast:
         menu.set("content", command)
         return menu
 
-    @staticmethod
-    def Image(source: str, position: str = None, rounded: bool = None, remove_margin: bool = True) -> Element:
+    @classmethod
+    def Image(cls, source: str, position: str = None, rounded: bool = None, remove_margin: bool = True,
+              cache: ImageCache = None, scale: int = 100) -> Element:
         """
 
         By default, images are displayed inline, after any text elements, filling the full
@@ -914,11 +3157,20 @@ class Toast:
         If an image exceeds the file size, or fails to download, or times out, the image
         will be dropped and the rest of the notification will be displayed.
 
+        - cache:
+            An ImageCache: local images are replaced by a copy resized to the placement
+            size at the given 'scale' (100, 125, 150, 200 or 400).
+
         """
 
+        # ready-sized copy of local images, if a cache is given
+        location = None if cache is None else Assets.find(source)
+        if location is not None:
+            placement = position if position in ImageCache.SIZES else "inline"
+            source = cache.prepare(location, placement, scale)
         # create element and set default attributes
-        image = Element("image")
-        image.set("src", source)
+        image = cls.node("image")
+        image.set("src", Assets.resolve(source) or source)
         # remove empty image margin if required
         if remove_margin is True:
             image.set("hint-removeMargin", "true")
@@ -932,10 +3184,33 @@ class Toast:
         return image
 
 
-    @staticmethod
-    def InputBox(tag: str, placeholder: str = "...") -> Element:
+    @classmethod
+    def Progress(cls, status: str = "{progressStatus}", value: str = "{progressValue}",
+                 title: str = None, label: str = None) -> Element:
+        """
+        Progress bar, to be placed in the binding.
+        Values written as {key} are bound to Toast.data and change with Toast.update:
+
+            toast.data = {"progressValue": "0.0", "progressStatus": "Copying..."}
+            toast.send()
+            toast.update({"progressValue": "0.5"})
+
+        value:      from 0.0 to 1.0, or 'indeterminate'
+        label:      text shown in place of the percentage
+        """
+        progress = cls.node("progress")
+        if title is not None:
+            progress.set("title", title)
+        progress.set("value", value)
+        if label is not None:
+            progress.set("valueStringOverride", label)
+        progress.set("status", status)
+        return progress
+
+    @classmethod
+    def InputBox(cls, tag: str, placeholder: str = "...") -> Element:
         # init the element
-        inputbox = Element("input")
+        inputbox = cls.node("input")
         inputbox.set("type", "text")
         # set default attributes
         inputbox.set("id", tag)
@@ -945,22 +3220,22 @@ class Toast:
         inputbox.set("placeHolderContent", placeholder)
         return inputbox
 
-    @staticmethod
-    def Selection(key: str, value: str) -> Element:
+    @classmethod
+    def Selection(cls, key: str, value: str) -> Element:
         """
         Create selection option to be append in a Toast.SelectionBox.
         Need a pair key, value.
         """
-        selection = Element("selection")
+        selection = cls.node("selection")
         selection.set("id", key)
         selection.set("content", value)
         return selection
 
-    @staticmethod
-    def SelectionBox(*selections: str | tuple, name: str = "SelectionBox",
+    @classmethod
+    def SelectionBox(cls, *selections: str | tuple, name: str = "SelectionBox",
                      label: str = "", default: int = 0) -> Element:
         # init the element
-        selectbox = Element("input")
+        selectbox = cls.node("input")
         selectbox.set("type", "selection")
         # set default attributes
         selectbox.set("id", name)
@@ -973,7 +3248,7 @@ class Toast:
             selections = list(enumerate(selections))
         # generate and append options
         for idn, label in selections:
-            option = Toast.Selection(str(idn), label)
+            option = cls.Selection(str(idn), label)
             selectbox.append(option)
         # set the default
         selectbox.set("defaultInput", str(selections[default][0]))
@@ -1074,25 +3349,64 @@ class Toast:
 
         """
         TEMPLATE_NUMBER: int = number
-        content: wx.XmlDocument = wn.ToastNotificationManager.get_template_content(TEMPLATE_NUMBER)
+        content: wx.XmlDocument = Backend.current().get_template_content(TEMPLATE_NUMBER)
         template: str = content.get_xml()
         tree = Tree(template)
         return cls(tree)
 
 
     @classmethod
-    def os_history(cls, app_id: str = "Python", toast_tag: str = None, user: str = None):
-        manager = wn.ToastNotificationManager if user is None else wn.ToastNotificationManagerForUser(user)
-        history = manager.history.get_history(app_id)
-        history_list = [cls.from_win(toast) for toast in history]
-        return history_list
+    def os_history(cls, app_id: str = "Python", toast_tag: str = None, user: str = None,
+                   backend: Backend = None, toast_group: str = None,
+                   offset: int = 0, limit: int = None, newest: bool = True):
+        """
+        Yield the toasts of the app still in the action center, newest first by default.
+        Tag and group are matched on the native notifications, and only the entries
+        in the page (skip 'offset' matches, then at most 'limit') are converted,
+        one at a time as the generator is consumed.
+        """
+        manager = Backend.current() if backend is None else backend
+        history = manager.history(user).get_history(app_id)
+        size = len(history)
+        positions = range(size - 1, -1, -1) if newest else range(size)
+        # filter on the native objects, cheap attribute reads
+        matches = (history[i] for i in positions)
+        if toast_tag is not None:
+            matches = (n for n in matches if n.tag == toast_tag)
+        if toast_group is not None:
+            matches = (n for n in matches if n.group == toast_group)
+        stop = None if limit is None else offset + limit
+        for notification in it.islice(matches, offset, stop):
+            yield cls.from_win(notification, app_id, backend, user)
+
+    @classmethod
+    def from_win(cls, notification: wn.ToastNotification, app_id: str = "Python",
+                 backend: Backend = None, user = None) -> Toast:
+        """
+        Get a toast from a native notification, e.g. one of the history.
+        The document is kept as it is, timestamp and launch included.
+        """
+        tree = Tree(notification.content)
+        attributes = dict(tree.root.attrib)
+        toast = cls(tree, app_id, backend, user)
+        # init set the defaults and the current time, the shown values count
+        root = toast.xml.root
+        root.attrib.clear()
+        root.attrib.update(attributes)
+        toast.tag = notification.tag or ""
+        toast.group = notification.group or ""
+        data = getattr(notification, "data", None)
+        if data is not None:
+            toast.data = dict(data.values)
+            toast.seq_number = data.sequence_number
+        return toast
 
     @staticmethod
-    def os_clear(app_id: str = "Python", toast_group: str = None, toast_tag: str = None, user: str = None):
-        # check call namespace preference
-        manager = wn.ToastNotificationManager if user is None else wn.ToastNotificationManagerForUser(user)
+    def os_clear(app_id: str = "Python", toast_group: str = None, toast_tag: str = None, user: str = None,
+                 backend: Backend = None):
+        manager = Backend.current() if backend is None else backend
         # get history
-        history_manager = manager.history
+        history_manager = manager.history(user)
         # removing
         if toast_group is not None and toast_tag is None:
             # clear all group notification of app
@@ -1107,94 +3421,844 @@ class Toast:
 
 
     def __str__(self):
-        # get indented string xml
-        string = xe.tostring(self.xml, encoding="unicode")
+        # xml string, scenario rules applied
+        string = xe.tostring(Toast.scenario(self._xml.root), encoding="unicode")
         return string
 
     def __repr__(self):
-        # get xml string and send it to the parser
-        string = str(self.xml)
-        temp_element = xe.XML(string)
-        # indent it and cast in string
-        xe.indent(temp_element)
-        string_indented = xe.tostring(temp_element, encoding="unicode")
-        return string_indented
+        # indented, scenario rules applied as in str
+        return Element.pretty(Toast.scenario(self._xml.root))
 
 
 
     def create_notification(self):
         app_tag: str = self.app_id if self.app_id not in (None, "") else Toast.DEFAULT_APPID
-        notification = self.manager.create_toast_notifier(app_tag)
+        notification = self.manager.notifiers.get(app_tag, self.user)
         return notification
 
     def send(self):
+        probe = self.probe
+        begin = probe.clock() if probe is not None else 0.0
         notification = self.notification
-        toast = self.manager.create_toast_notifier(self.app_id)
-        toast.show(notification)
+        # identification and data bound values, if any
+        if self._data and self.tag == "":
+            self.tag = f"{id(self):x}"  # updates need a tag
+        if self.tag != "":
+            notification.tag = self.tag
+        if self.group != "":
+            notification.group = self.group
+        if self._data:
+            notification.data = self.manager.create_notification_data(self._data, self.seq_number)
+        if self.priority == Toast.PRIORITY_HIGH:
+            notification.priority = self.priority  # ToastNotificationPriority.HIGH
+        if probe is None:
+            toast = self.manager.notifiers.get(self.app_id, self.user)
+            toast.show(notification)
+        else:
+            start = probe.clock()
+            toast = self.manager.notifiers.get(self.app_id, self.user)
+            start = probe.lap("notifier", start, self)
+            toast.show(notification)
+            probe.lap("show", start, self)
+        if self.store is not None:
+            # the xml string was cached while building the notification
+            self._stored = self.store.record(self._wxml[3], self.app_id, self.tag, self.group, self.user)
+        if probe is not None:
+            probe.lap("send", begin, self)
         return True
 
+    def schedule(self, at: dt.datetime | float, scheduler: Scheduler = None, native: bool = False):
+        """
+        Deliver the toast at a future time: a datetime or seconds since the epoch.
+        With native True Windows keeps the toast (ScheduledToastNotification),
+        otherwise the in-process Scheduler sends it.
+        """
+        scheduler = Scheduler.current() if scheduler is None else scheduler
+        return scheduler.add(self, at, native=native)
+
+    async def send_async(self, timeout: float = None) -> Event:
+        """
+        Send the toast and wait for the user response, without polling.
+        The response arrives on a WinRT thread and resolves a future of the running loop,
+        so any number of toasts can be awaited together on one event loop.
+        Raise TimeoutError when no response comes within 'timeout' seconds.
+        """
+        # imported here: asyncio alone would double the import time of toasted
+        import asyncio as ai
+        loop = ai.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(event: Event):
+            if not future.done():
+                future.set_result(event)
+
+        def waiter(event: Event):
+            try:
+                loop.call_soon_threadsafe(resolve, event)
+            except RuntimeError:
+                pass  # loop already closed, nobody is waiting anymore
+
+        if self._waiters is None:
+            self._waiters = list()
+        self._waiters.append(waiter)
+        try:
+            self.send()
+            try:
+                return await ai.wait_for(future, timeout)
+            except ai.TimeoutError:
+                # a class of its own before Python 3.11
+                raise TimeoutError(f"no response within {timeout} seconds") from None
+        finally:
+            if self._waiters is not None and waiter in self._waiters:
+                self._waiters.remove(waiter)
+
     def clear_history():
         pass
 
     def replace():
         pass
 
-    def update(self, data, tag, group):
+    def update(self, data: dict = None, tag: str = None, group: str = None):
         """
+        Update the data bound values of the shown toast (e.g. a progress bar).
+        The sequence number grows at every update, so Windows drops late ones.
+        To update many times per second use an Updater.
+
         See:    learn.microsoft.com/en-us/windows/apps/design/shell/
                 tiles-and-notifications/toast-progress-bar?tabs=xml
         """
-        self.manager.create_toast_notifier().update(data, tag, group)
+        if data is not None:
+            self.data.update(data)
+        self.seq_number += 1
+        tag = self.tag if tag is None else tag
+        group = self.group if group is None else group
+        notification_data = self.manager.create_notification_data(self.data, self.seq_number)
+        notifier = self.manager.notifiers.get(self.app_id, self.user)
+        result = notifier.update(notification_data, tag, group)
+        # NotificationUpdateResult.SUCCEEDED
+        return int(result) == 0
+
+
+
+
+
+class Draft:
+
+    """
+    Compact stand-in of a toast waiting in a SendQueue or in a Scheduler.
+    The content is a Node tree: the Toast, with its Element tree, is made only when
+    the draft is sent. Build the nodes calling the Toast builders on Draft
+    (Draft.Text, Draft.Button...), or compact an existing toast with Draft.of.
+    """
+
+    __slots__ = "root", "app_id", "tag", "group", "data", "priority", "user", "backend"
+
+    node: type = Node
+
+    # the Toast builders, making Node objects when called on Draft
+    BUILDERS = ("Section", "Visual", "Binding", "Actions", "Audio", "Subgroup", "Group", "Header",
+                "Text", "Button", "ButtonPospone", "ButtonDismiss", "Context", "Image", "Progress",
+                "InputBox", "Selection", "SelectionBox")
+
+    def __init__(self, root: Node, app_id: str = "Python", backend: Backend = None, user = None):
+        root.settle()
+        self.root = root
+        self.app_id = "Python" if app_id is None else app_id
+        self.tag = ""
+        self.group = ""
+        self.data = None
+        self.priority = Toast.PRIORITY_LOW
+        self.user = user
+        self.backend = backend
+
+    @classmethod
+    def of(cls, toast: Toast) -> Draft:
+        """
+        Compact a toast, keeping its document and its send settings
+        """
+        draft = cls(Node.of(toast.xml.root), toast.app_id, toast.backend, toast.user)
+        draft.tag = toast.tag
+        draft.group = toast.group
+        draft.data = dict(toast._data) if toast._data else None
+        draft.priority = toast.priority
+        return draft
+
+    def toast(self) -> Toast:
+        """
+        Get the full Toast. Root attributes of the draft win over the Toast defaults.
+        """
+        toast = Toast(Tree(self.root.element()), self.app_id, self.backend, self.user)
+        root = toast.xml.root
+        root.attrib.update(self.root.attrib)
+        toast.tag = self.tag
+        toast.group = self.group
+        if self.data:
+            toast.data = dict(self.data)
+        toast.priority = self.priority
+        return toast
+
+    def send(self) -> Toast:
+        """
+        Make the Toast and send it, return it to follow the user response
+        """
+        toast = self.toast()
+        toast.send()
+        return toast
+
+    def __str__(self):
+        return self.root.tostring()
+
+    def __repr__(self):
+        return f"<Draft {self.root.tag} app_id={self.app_id!r} tag={self.tag!r}>"
+
+
+for _builder in Draft.BUILDERS:
+    setattr(Draft, _builder, vars(Toast)[_builder])
+del _builder
+
+
+
+
+class Blueprint:
+
+    """
+    Compiled toast template.
+    The toast is serialized once with markers in place of the slots and split into
+    static chunks: rendering is then a single join of the escaped slot values.
+
+    Slots are declared as  name=(xpath, attribute),  attribute None for the node text:
+
+        card = Blueprint(toast, name=("./visual/binding/text", None),
+                                photo=("./visual/binding/image", "src"))
+        xml = card.render(name="Frank", photo=r"file:///C:/photos/frank.png")
+
+    The 'timestamp' slot (the toast displayTimestamp) is always there and defaults to now.
+    """
+
+    MARK = re.compile("\ue000(\\d+)\ue001")
+
+    def __init__(self, source: Toast | Tree, **slots: tuple[str, str | None]):
+        # work on a copy, the source stays as it is
+        if isinstance(source, Toast):
+            toast = source.clone()
+        else:
+            toast = Toast(Tree(source.root.copy()))
+        slots["timestamp"] = (".", "displayTimestamp")
+        self.names: tuple[str, ...] = tuple(slots)
+        self.defaults: dict[str, str] = dict()
+        self._escape: list = list()
+        # put the markers
+        for number, (name, (xpath, attribute)) in enumerate(slots.items()):
+            node = toast.xml.root if xpath in (".", "./") else toast.xml.find(xpath)
+            if node is None:
+                raise KeyError(f"slot {name!r}: no node at {xpath!r}")
+            mark = f"\ue000{number}\ue001"
+            if attribute is None:
+                self.defaults[name] = node.text or ""
+                self._escape.append(Element.TEXT)
+                node.text = mark
+            else:
+                self.defaults[name] = node.get(attribute, "")
+                self._escape.append(Element.ATTRIB)
+                node.set(attribute, mark)
+        # render plan: static chunks with the slot numbers in between
+        chunks = Blueprint.MARK.split(str(toast))
+        self._static: list[str] = chunks[0::2]
+        self._slots: list[int] = [int(number) for number in chunks[1::2]]
+        self._documents = cl.OrderedDict()
+        self._lock = th.Lock()
+
+    def render(self, **values) -> str:
+        """
+        Get the toast xml string with the given slot values (defaults for the missing ones)
+        """
+        unknown = values.keys() - self.defaults.keys()
+        if unknown:
+            raise KeyError(f"unknown slots: {', '.join(sorted(unknown))}")
+        values["timestamp"] = Toast.isotime(values.get("timestamp", ""))
+        parts = [self._static[0]]
+        for number, static in zip(self._slots, self._static[1:]):
+            name = self.names[number]
+            value = values.get(name, self.defaults[name])
+            parts.append(str(value).translate(self._escape[number]))
+            parts.append(static)
+        return "".join(parts)
+
+    def document(self, values: dict = None, backend: Backend = None, cache: int = 128):
+        """
+        Get the loaded document of the rendered toast.
+        Documents are cached by slot values: only the timestamp is patched on a hit.
+        """
+        values = dict() if values is None else dict(values)
+        manager = Backend.current() if backend is None else backend
+        stamp = Toast.isotime(values.pop("timestamp", ""))
+        key = manager, tuple(sorted(values.items()))
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+        if document is None:
+            document = manager.load_xml(self.render(timestamp=stamp, **values))
+            with self._lock:
+                self._documents[key] = document
+                while len(self._documents) > cache:
+                    self._documents.popitem(last=False)
+            return document
+        return manager.set_attribute(document, "displayTimestamp", stamp)
+
+    def send(self, values: dict = None, app_id: str = "Python", user = None, backend: Backend = None):
+        """
+        Show the rendered toast straight away, return the notification
+        """
+        manager = Backend.current() if backend is None else backend
+        notification = manager.create_notification(self.document(values, manager))
+        manager.notifiers.get(app_id, user).show(notification)
+        return notification
+
+    @classmethod
+    @ft.cache
+    def Reminder(cls) -> Blueprint:
+        """
+        Toast.Reminder compiled. Slots: title, subject, text, launch.
+        """
+        return cls(Toast.Reminder(),
+                   title=("./visual/binding/text", None),
+                   subject=("./visual/binding/group/subgroup/text[1]", None),
+                   text=("./visual/binding/group/subgroup/text[2]", None),
+                   launch=(".", "launch"))
+
+    @classmethod
+    @ft.cache
+    def IncomingCall(cls) -> Blueprint:
+        """
+        Toast.IncomingCall compiled. Slots: title, caller, info, image, answer, launch.
+        """
+        return cls(Toast.IncomingCall(),
+                   title=("./visual/binding/text", None),
+                   caller=("./visual/binding/group/subgroup/text[1]", None),
+                   info=("./visual/binding/group/subgroup/text[2]", None),
+                   image=("./visual/binding/image", "src"),
+                   answer=("./actions/action[4]", "arguments"),
+                   launch=(".", "launch"))
+
+    def __repr__(self):
+        return f"<Blueprint slots: {', '.join(self.names)}>"
+
+
+
+
+class Updater:
+
+    """
+    Coalesce high frequency data updates of data bound toasts.
+    Every tag gets at most 'rate' updates per second: values submitted meanwhile
+    are merged and only the latest ones reach the shell.
+
+        updater = Updater(rate=4)
+        for done in copy_job():
+            updater.submit(toast, progressValue=f"{done:.2f}")
+        updater.flush()
+    """
+
+    def __init__(self, rate: float = 4.0):
+        self.interval = 1.0 / rate
+        self.submitted = 0
+        self.sent = 0
+        self._pending: dict[tuple, list] = dict()     # key -> [toast, merged values]
+        self._last: dict[tuple, float] = dict()       # key -> time of the last update
+        self._timers: dict[tuple, th.Timer] = dict()
+        self._lock = th.Lock()
+
+    def submit(self, toast: Toast, data: dict = None, **values) -> bool:
+        """
+        Queue new values for the toast. Return True if they were sent straight away.
+        """
+        key = toast.app_id, toast.group, toast.tag
+        values = values if data is None else {**data, **values}
+        with self._lock:
+            self.submitted += 1
+            pending = self._pending.setdefault(key, [toast, dict()])
+            pending[0] = toast
+            pending[1].update(values)
+            if key in self._timers:
+                return False
+            wait = self._last.get(key, -self.interval) + self.interval - tm.monotonic()
+            if wait > 0:
+                timer = th.Timer(wait, self._flush, (key,))
+                timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+                return False
+        self._flush(key)
+        return True
+
+    def _flush(self, key: tuple):
+        with self._lock:
+            self._timers.pop(key, None)
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return
+            self._last[key] = tm.monotonic()
+            self.sent += 1
+        toast, values = pending
+        toast.update(values)
+
+    def flush(self):
+        """
+        Send all pending values now
+        """
+        with self._lock:
+            keys = list(self._pending)
+            for key in keys:
+                timer = self._timers.pop(key, None)
+                if timer is not None:
+                    timer.cancel()
+        for key in keys:
+            self._flush(key)
+
+    def stats(self) -> dict[str, int]:
+        return {"submitted": self.submitted, "sent": self.sent, "pending": len(self._pending)}
+
+
+
+
+class TokenBucket:
+
+    """
+    Token bucket: 'rate' tokens per second, at most 'burst' of them saved up.
+    """
+
+    def __init__(self, rate: float, burst: int, clock = tm.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.time = clock()
+
+    def take(self) -> float:
+        """
+        Take a token: return 0 on success, otherwise the seconds to wait for the next one
+        """
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.time) * self.rate)
+        self.time = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class SendQueue:
+
+    """
+    Send scheduler with priority lanes and per-app token bucket limits.
+    High priority toasts (Toast.PRIORITY_HIGH) skip ahead of the queued low priority
+    ones; every app_id sends at most 'rate' toasts per second with bursts of 'burst'.
+    When 'size' toasts are queued the oldest low priority one is dropped to make room,
+    so an alert storm degrades instead of freezing the notification center.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 5, size: int = 1000, clock = tm.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.size = size
+        self.clock = clock
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.waited = 0.0       # total seconds spent in the queue by the taken toasts, sent or failed
+        self.waited_max = 0.0
+        # priority -> app_id -> queued (toast, time)
+        self._lanes = {Toast.PRIORITY_HIGH: cl.OrderedDict(), Toast.PRIORITY_LOW: cl.OrderedDict()}
+        self._buckets: dict[str, TokenBucket] = dict()
+        self._limits: dict[str, tuple[float, int]] = dict()
+        self._queued = 0
+        self._busy = 0
+        self._closed = False
+        self._condition = th.Condition()
+        self._thread = None
+
+    def limit(self, app_id: str, rate: float, burst: int = 1):
+        """
+        Set a specific limit for an app
+        """
+        with self._condition:
+            self._limits[app_id] = rate, burst
+            self._buckets.pop(app_id, None)
+
+    def put(self, toast: Toast, priority: int = None) -> bool:
+        """
+        Queue a toast, by default in the lane of its own priority.
+        Return False if the queue is full and the toast was dropped.
+        """
+        priority = toast.priority if priority is None else priority
+        lane = Toast.PRIORITY_HIGH if priority == Toast.PRIORITY_HIGH else Toast.PRIORITY_LOW
+        with self._condition:
+            if self._queued >= self.size and not self._drop_low(lane):
+                self.dropped += 1
+                return False
+            self._lanes[lane].setdefault(toast.app_id, cl.deque()).append((toast, self.clock()))
+            self._queued += 1
+            self._condition.notify()
+        if self._thread is None:
+            self.start()
+        return True
+
+    def _drop_low(self, lane: int) -> bool:
+        # make room for a high priority toast dropping the oldest low priority one
+        lows = self._lanes[Toast.PRIORITY_LOW]
+        if lane != Toast.PRIORITY_HIGH or not lows:
+            return False
+        oldest = min(lows, key=lambda app_id: lows[app_id][0][1])
+        lows[oldest].popleft()
+        if not lows[oldest]:
+            del lows[oldest]
+        self._queued -= 1
+        self.dropped += 1
         return True
 
+    def _bucket(self, app_id: str) -> TokenBucket:
+        bucket = self._buckets.get(app_id)
+        if bucket is None:
+            rate, burst = self._limits.get(app_id, (self.rate, self.burst))
+            bucket = self._buckets[app_id] = TokenBucket(rate, burst, self.clock)
+        return bucket
+
+    def _next(self) -> tuple[Toast | None, float]:
+        # first sendable toast: high lane first, apps in turn; otherwise the time to wait
+        wait = None
+        for lane in (self._lanes[Toast.PRIORITY_HIGH], self._lanes[Toast.PRIORITY_LOW]):
+            for app_id in list(lane):
+                delay = self._bucket(app_id).take()
+                if delay > 0:
+                    wait = delay if wait is None else min(wait, delay)
+                    continue
+                toast, queued = lane[app_id].popleft()
+                if lane[app_id]:
+                    lane.move_to_end(app_id)
+                else:
+                    del lane[app_id]
+                self._queued -= 1
+                waited = self.clock() - queued
+                self.waited += waited
+                self.waited_max = max(self.waited_max, waited)
+                return toast, 0.0
+        return None, wait
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._closed = False
+                self._thread = th.Thread(target=self._work, name="toasted-send-queue", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Send what is queued (as the limits allow), then stop the worker
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def join(self):
+        """
+        Wait until the queue is empty
+        """
+        with self._condition:
+            while self._queued or self._busy:
+                self._condition.wait()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                toast, wait = self._next()
+                while toast is None:
+                    if self._closed and not self._queued:
+                        return
+                    self._condition.wait(wait)
+                    toast, wait = self._next()
+                self._busy += 1
+            try:
+                toast.send()
+            except Exception:
+                with self._condition:
+                    self.errors += 1
+            else:
+                with self._condition:
+                    self.sent += 1
+            finally:
+                with self._condition:
+                    self._busy -= 1
+                    self._condition.notify_all()
+
+    def depth(self) -> dict[int, int]:
+        """
+        Get the number of queued toasts per priority lane
+        """
+        with self._condition:
+            return {priority: sum(map(len, lane.values())) for priority, lane in self._lanes.items()}
+
+    def stats(self) -> dict[str, float]:
+        depth = self.depth()
+        with self._condition:
+            taken = self.sent + self.errors
+            return {"queued_high": depth[Toast.PRIORITY_HIGH], "queued_low": depth[Toast.PRIORITY_LOW],
+                    "sent": self.sent, "dropped": self.dropped, "errors": self.errors,
+                    "wait_mean": self.waited / taken if taken else 0.0,
+                    "wait_max": self.waited_max}
+
+
+
+
+class Scheduled:
+
+    """
+    Toast waiting in the Scheduler
+    """
+
+    __slots__ = "due", "number", "toast", "key"
+
+    def __init__(self, due: float, number: int, toast: Toast):
+        self.due = due
+        self.number = number
+        self.toast = toast      # None once cancelled
+        self.key = toast.app_id, toast.group, toast.tag
+
+    def __lt__(self, other: Scheduled) -> bool:
+        return (self.due, self.number) < (other.due, other.number)
+
+
+class Scheduler:
+
+    """
+    In-process scheduler for toasts to be delivered later.
+    Pending toasts sit in a binary heap (cheap even with 100k+ of them) and are
+    indexed by (app_id, group, tag) and sequence number, so they can be cancelled
+    by tag or group and popped without scanning the toasts sharing their key.
+    Cancelled entries are only marked, the heap is compacted when they pile up.
+
+    The clock is pluggable: with a fake clock call run_pending() instead of start().
+    """
+
+    _current = None
+    _guard = th.Lock()
+
+    def __init__(self, clock = tm.time):
+        self.clock = clock
+        self.sent = 0
+        self.errors = 0
+        self._heap: list[Scheduled] = list()
+        self._index: dict[tuple, dict[int, Scheduled]] = dict()
+        self._numbers = it.count()
+        self._pending = 0
+        self._closed = False
+        self._condition = th.Condition()
+        self._thread = None
+
+    @staticmethod
+    def current() -> Scheduler:
+        """
+        Get the process wide scheduler, started
+        """
+        with Scheduler._guard:
+            if Scheduler._current is None:
+                Scheduler._current = Scheduler()
+                Scheduler._current.start()
+            return Scheduler._current
+
+    @staticmethod
+    def due(at: dt.datetime | float) -> float:
+        """
+        Get the seconds since the epoch of a datetime (naive means local time)
+        """
+        return at.timestamp() if isinstance(at, dt.datetime) else float(at)
+
+    def add(self, toast: Toast, at: dt.datetime | float, native: bool = False):
+        """
+        Schedule the toast. Return the heap entry, or the native scheduled notification.
+        """
+        due = Scheduler.due(at)
+        if native:
+            return self._native(toast, due)
+        entry = Scheduled(due, next(self._numbers), toast)
+        with self._condition:
+            hq.heappush(self._heap, entry)
+            self._index.setdefault(entry.key, dict())[entry.number] = entry
+            self._pending += 1
+            # wake the worker only if the new toast comes first
+            if self._heap[0] is entry:
+                self._condition.notify()
+        return entry
+
+    @staticmethod
+    def _native(toast: Toast, due: float):
+        manager = toast.manager
+        delivery = dt.datetime.fromtimestamp(due, dt.timezone.utc)
+        scheduled = manager.create_scheduled_notification(toast.Wxml, delivery)
+        if toast.tag != "":
+            scheduled.tag = toast.tag
+        if toast.group != "":
+            scheduled.group = toast.group
+        manager.notifiers.get(toast.app_id, toast.user).add_to_schedule(scheduled)
+        return scheduled
+
+    def cancel(self, tag: str = None, group: str = None, app_id: str = "Python", native: bool = False,
+               backend: Backend = None, user = None) -> int:
+        """
+        Cancel the pending toasts of the app matching tag and/or group (all of them if both None).
+        With native True the toasts scheduled in Windows are removed too.
+        Return the number of cancelled toasts.
+        """
+        match = lambda key: key[0] == app_id and (group is None or key[1] == group) \
+                            and (tag is None or key[2] == tag)
+        cancelled = 0
+        with self._condition:
+            if tag is not None and group is not None:
+                keys = [(app_id, group, tag)] if (app_id, group, tag) in self._index else []
+            else:
+                keys = [key for key in self._index if match(key)]
+            for key in keys:
+                for entry in self._index.pop(key).values():
+                    entry.toast = None
+                    cancelled += 1
+            self._pending -= cancelled
+            if len(self._heap) > 64 and self._pending < len(self._heap) // 2:
+                self._heap = [entry for entry in self._heap if entry.toast is not None]
+                hq.heapify(self._heap)
+        if native:
+            manager = Backend.current() if backend is None else backend
+            notifier = manager.notifiers.get(app_id, user)
+            for scheduled in list(notifier.get_scheduled_toast_notifications()):
+                if match((app_id, scheduled.group, scheduled.tag)):
+                    notifier.remove_from_schedule(scheduled)
+                    cancelled += 1
+        return cancelled
+
+    def _pop_due(self, now: float) -> list[Toast]:
+        toasts = list()
+        heap = self._heap
+        while heap and heap[0].due <= now:
+            entry = hq.heappop(heap)
+            if entry.toast is None:
+                continue
+            toasts.append(entry.toast)
+            entries = self._index.get(entry.key)
+            if entries is not None:
+                del entries[entry.number]
+                if not entries:
+                    del self._index[entry.key]
+        self._pending -= len(toasts)
+        return toasts
+
+    def _next_due(self) -> float | None:
+        # drop the cancelled entries on top
+        while self._heap and self._heap[0].toast is None:
+            hq.heappop(self._heap)
+        return self._heap[0].due if self._heap else None
+
+    def run_pending(self) -> int:
+        """
+        Send the toasts that are due now, return how many
+        """
+        with self._condition:
+            toasts = self._pop_due(self.clock())
+        self._send(toasts)
+        return len(toasts)
+
+    def _send(self, toasts: list[Toast]):
+        for toast in toasts:
+            try:
+                toast.send()
+                self.sent += 1
+            except Exception:
+                self.errors += 1
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._closed = False
+                self._thread = th.Thread(target=self._work, name="toasted-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Stop the worker, the pending toasts stay scheduled
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                due = self._next_due()
+                now = self.clock()
+                if due is None or due > now:
+                    self._condition.wait(None if due is None else due - now)
+                    continue
+                toasts = self._pop_due(now)
+            self._send(toasts)
+
+    def __len__(self):
+        return self._pending
+
 
 
 
+if __name__ == "__main__":
 
-toast = Element("toast")
-header = Toast.Header("8729", title="App")
-visual = Toast.Visual()
-binding = Toast.Binding()
+    toast = Element("toast")
+    header = Toast.Header("8729", title="App")
+    visual = Toast.Visual()
+    binding = Toast.Binding()
 
-text1 = Toast.Text("Conf Room 2001 / Building 135")
-text2 = Toast.Text("10:00 AM - 10:30 AM")
+    text1 = Toast.Text("Conf Room 2001 / Building 135")
+    text2 = Toast.Text("10:00 AM - 10:30 AM")
 
-source = r"img.png"
-image = Toast.Image(source, position="appLogoOverride", rounded=True)
+    source = r"img.png"
+    image = Toast.Image(source, position="appLogoOverride", rounded=True)
 
-actions = Toast.Actions()
-inp = Toast.InputBox("textBox", placeholder="Choose one option")
-menu = Toast.Context("Premi per uscire")
-butt = Toast.Button("Ok", tip="clicca", inputbox="ins2")
-butt2 = Toast.Button("Send", tip="send", color="g")
-butt3 = Toast.Button("Cancel", tip="clicca", color="r")
+    actions = Toast.Actions()
+    inp = Toast.InputBox("textBox", placeholder="Choose one option")
+    menu = Toast.Context("Premi per uscire")
+    butt = Toast.Button("Ok", tip="clicca", inputbox="textBox")
+    butt2 = Toast.Button("Send", tip="send", color="g")
+    butt3 = Toast.Button("Cancel", tip="clicca", color="r")
 
-sel = Toast.SelectionBox("John", "Frank", "Robert", label="Send Invitation")
-audio = Toast.Audio("alarm3")
+    sel = Toast.SelectionBox("John", "Frank", "Robert", label="Send Invitation")
+    audio = Toast.Audio("alarm3")
 
-binding.extend([text1, text2, image])
-visual.append(binding)
+    binding.extend([text1, text2, image])
+    visual.append(binding)
 
-toast.append(header)
-toast.append(audio)
-toast.append(visual)
+    toast.append(header)
+    toast.append(audio)
+    toast.append(visual)
 
-actions.append(sel)
-actions.append(inp)
+    actions.append(sel)
+    actions.append(inp)
 
-actions.append(menu)
-actions.append(butt)
-actions.append(butt2)
-actions.append(butt3)
+    actions.append(menu)
+    actions.append(butt)
+    actions.append(butt2)
+    actions.append(butt3)
 
 
-toast.append(actions)
+    toast.append(actions)
 
-xml = Tree(toast)
+    xml = Tree(toast)
 
-t = Toast(xml)
+    t = Toast(xml)
 
-call = Toast.IncomingCall()
-call.send()
+    call = Toast.IncomingCall()
+    call.send()
 
-rem = Toast.Reminder()
\ No newline at end of file
+    rem = Toast.Reminder()
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from toasted.toasted import Assets
+
+
+@pytest.fixture(autouse=True)
+def assets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Assets, "roots", [])
+    Assets.clear()
+    yield
+    Assets.clear()
+
+
+def test_relative_paths_resolve_in_the_working_directory(tmp_path):
+    (tmp_path / "icon.png").write_bytes(b"png")
+    assert Assets.find("icon.png") == str(tmp_path / "icon.png")
+    assert Assets.resolve("icon.png") == (tmp_path / "icon.png").as_uri()
+    assert Assets.resolve("missing.png") is None
+    assert Assets.resolve("https://example.com/a.png") == "https://example.com/a.png"
+
+
+def test_cached_entries_are_checked_again_after_recheck(tmp_path, monkeypatch):
+    icon = tmp_path / "icon.png"
+    icon.write_bytes(b"png")
+    assert Assets.find("icon.png") is not None
+    os.remove(icon)
+    # within 'recheck' seconds the cached answer stands
+    assert Assets.find("icon.png") is not None
+    monkeypatch.setattr(Assets, "recheck", 0.0)
+    assert Assets.find("icon.png") is None
+    icon.write_bytes(b"png")
+    assert Assets.find("icon.png") == str(icon)
+
+
+def test_the_cache_keeps_the_most_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(Assets, "size", 2)
+    for name in ("a.png", "b.png", "c.png"):
+        (tmp_path / name).write_bytes(b"png")
+    Assets.find("a.png")
+    Assets.find("b.png")
+    Assets.find("a.png")
+    Assets.find("c.png")
+    cwd = os.getcwd()
+    assert list(Assets._cache) == [("a.png", cwd), ("c.png", cwd)]
+
+
+def test_the_working_directory_is_part_of_the_key(tmp_path, monkeypatch):
+    for folder in ("one", "two"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "icon.png").write_bytes(b"png")
+    monkeypatch.chdir(tmp_path / "one")
+    first = Assets.find("icon.png")
+    monkeypatch.chdir(tmp_path / "two")
+    assert Assets.find("icon.png") != first
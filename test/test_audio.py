@@ -0,0 +1,21 @@
+import os
+
+from toasted.toasted import Audio
+
+
+def test_locate_follows_the_working_directory(tmp_path, monkeypatch):
+    for name in ("one", "two"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "ding.wav").write_bytes(b"")
+    monkeypatch.chdir(tmp_path / "one")
+    assert Audio.locate("ding.wav") == os.path.join(tmp_path, "one", "ding.wav")
+    monkeypatch.chdir(tmp_path / "two")
+    assert Audio.locate("ding.wav") == os.path.join(tmp_path, "two", "ding.wav")
+
+
+def test_locate_finds_a_file_missing_before(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Audio, "recheck", 0.0)
+    assert Audio.locate("late.wav") is None
+    (tmp_path / "late.wav").write_bytes(b"")
+    assert Audio.locate("late.wav") == os.path.join(tmp_path, "late.wav")
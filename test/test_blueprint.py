@@ -0,0 +1,13 @@
+from toasted.toasted import Blueprint, Toast
+
+
+def test_render_escapes_like_the_serializer():
+    base = Toast.Reminder()
+    card = Blueprint(base, title=("./visual/binding/text", None),
+                     label=("./actions/input", "title"))
+    values = {"title": 'Tom & "Jerry" <3', "label": 'a "quoted"\n<label> & tab\t'}
+    toast = base.clone()
+    toast.binding[0].text = values["title"]
+    toast.actions.find("input").set("title", values["label"])
+    toast.timestamp("2024-06-25 11:02:54")
+    assert card.render(timestamp=toast.xml.root.get("displayTimestamp"), **values) == str(toast)
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from toasted.toasted import Dispatcher, Event, RecordingBackend, Toast
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = Dispatcher(size=2)
+    previous = Dispatcher.use(dispatcher)
+    yield dispatcher
+    dispatcher.stop()
+    Dispatcher.use(previous)
+
+
+def test_handlers_run_on_the_dispatcher_thread(dispatcher):
+    backend = RecordingBackend()
+    seen = list()
+    toast = Toast(backend=backend).on(Event.ACTIVATED, lambda event: seen.append(
+        (event.arguments, threading.current_thread().name)))
+    toast.send()
+    backend.activate(arguments="open")
+    dispatcher.join()
+    assert seen == [("open", "toasted-dispatcher-0")]
+    assert toast.event.arguments == "open"
+
+
+def test_full_queue_drops_events(dispatcher):
+    release = threading.Event()
+    dispatcher.subscribe(Event.DISMISSED, lambda event: release.wait(5))
+    events = [Event.Dismiss() for _ in range(6)]
+    taken = [dispatcher.put(event) for event in events]
+    # the worker holds one event, the queue two more
+    assert taken.count(False) >= 3
+    release.set()
+    dispatcher.join()
+    stats = dispatcher.stats()
+    assert stats["dropped"] == taken.count(False)
+    assert stats["dispatched"] == taken.count(True)
+
+
+def test_blocking_policy_waits_for_room(dispatcher):
+    dispatcher.policy, dispatcher.timeout = "block", 0.05
+    release = threading.Event()
+    dispatcher.subscribe(Event.DISMISSED, lambda event: release.wait(5))
+    taken = [dispatcher.put(Event.Dismiss()) for _ in range(4)]
+    assert taken[-1] is False and dispatcher.dropped >= 1
+    threading.Timer(0.01, release.set).start()
+    dispatcher.timeout = 5
+    assert dispatcher.put(Event.Dismiss())
+
+
+def test_handler_errors_are_counted(dispatcher):
+    dispatcher.subscribe(Event.FAILED, lambda event: 1 / 0)
+    dispatcher.put(Event.Fault(error=1))
+    dispatcher.join()
+    assert dispatcher.stats()["errors"] == 1
@@ -0,0 +1,24 @@
+import sys
+
+from toasted.toasted import Draft, Node, Toast
+
+
+def fresh(text: str) -> str:
+    # a new string object, equal to no interned one
+    return "".join(list(text))
+
+
+def test_free_values_are_neither_interned_nor_shared():
+    label = fresh("Meeting with recipient 4242")
+    draft = Draft(Draft.Section("toast"))
+    draft.root.append(Draft.Button(label, tip=label))
+    assert draft.root[0].get("content") is label
+    assert not any(label in pairs for pairs in Node.SHARED)
+    assert sys.intern(fresh(label)) is not label
+
+
+def test_names_and_fixed_values_are_shared():
+    first, second = (Draft(Draft.ButtonDismiss()).root for _ in range(2))
+    assert first._pairs is second._pairs
+    assert first.get("activationType") is Node.WORDS["system"]
+
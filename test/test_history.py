@@ -0,0 +1,56 @@
+from toasted.toasted import RecordingBackend, Toast
+
+
+def shown(count: int = 5) -> RecordingBackend:
+    backend = RecordingBackend()
+    for number in range(count):
+        toast = Toast(backend=backend)
+        toast.xml.root.set("launch", f"toast:{number}")
+        toast.tag = f"t{number}"
+        toast.group = "even" if number % 2 == 0 else "odd"
+        toast.send()
+    return backend
+
+
+def launches(toasts) -> list[str]:
+    return [toast.xml.root.get("launch") for toast in toasts]
+
+
+def test_history_is_newest_first_and_paged():
+    backend = shown()
+    assert launches(Toast.os_history(backend=backend)) == [f"toast:{n}" for n in (4, 3, 2, 1, 0)]
+    assert launches(Toast.os_history(backend=backend, newest=False, offset=1, limit=2)) == ["toast:1", "toast:2"]
+    assert list(Toast.os_history(app_id="other", backend=backend)) == []
+
+
+def test_history_filters_on_tag_and_group():
+    backend = shown()
+    toasts = list(Toast.os_history(backend=backend, toast_group="even", limit=2))
+    assert [(toast.tag, toast.group) for toast in toasts] == [("t4", "even"), ("t2", "even")]
+    assert launches(Toast.os_history(backend=backend, toast_tag="t3")) == ["toast:3"]
+
+
+def test_only_the_consumed_entries_are_converted(monkeypatch):
+    backend = shown()
+    converted = list()
+    from_win = Toast.from_win.__func__
+
+    def counting(cls, notification, *args, **kwargs):
+        converted.append(notification.tag)
+        return from_win(cls, notification, *args, **kwargs)
+
+    monkeypatch.setattr(Toast, "from_win", classmethod(counting))
+    pages = Toast.os_history(backend=backend, offset=1)
+    assert converted == []
+    next(pages)
+    assert converted == ["t3"]
+
+
+def test_clear_by_group_and_tag():
+    backend = shown()
+    Toast.os_clear(toast_group="odd", toast_tag="t1", backend=backend)
+    assert [toast.tag for toast in Toast.os_history(backend=backend)] == ["t4", "t3", "t2", "t0"]
+    Toast.os_clear(toast_group="even", backend=backend)
+    assert [toast.tag for toast in Toast.os_history(backend=backend)] == ["t3"]
+    Toast.os_clear(backend=backend)
+    assert list(Toast.os_history(backend=backend)) == []
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from toasted.toasted import ImageCache
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def noise(path, size=(1600, 800)):
+    Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(path)
+    return str(path)
+
+
+def test_rendered_images_stay_under_the_limit(tmp_path):
+    cache = ImageCache(str(tmp_path / "cache"))
+    target = cache.prepare(noise(tmp_path / "noise.png"), "hero", 400)
+    assert os.path.getsize(target) <= ImageCache.LIMIT
+
+
+def test_known_sources_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(ImageCache, "KNOWN", 2)
+    cache = ImageCache(str(tmp_path / "cache"))
+    for number in range(4):
+        cache.prepare(noise(tmp_path / f"{number}.png", (64, 64)), "logo")
+    assert len(cache._known) == 2
+
+
+def test_cache_hits_do_not_scan_the_folder(tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path / "cache"))
+    source = noise(tmp_path / "logo.png", (64, 64))
+    target = cache.prepare(source, "logo")     # first write: one scan to learn the folder size
+    scans = list()
+    monkeypatch.setattr(ImageCache, "trim", lambda self: scans.append(self))
+    monkeypatch.setattr(os, "utime", lambda *args: scans.append(args))
+    assert cache.prepare(source, "logo") == target
+    cache.prepare(source, "logo", 200)          # a new file under the budget
+    assert scans == []
+
+
+def test_trim_keeps_the_budget(tmp_path):
+    cache = ImageCache(str(tmp_path / "cache"))
+    targets = [cache.prepare(noise(tmp_path / f"{number}.png", (64, 64)), "logo") for number in range(3)]
+    cache.budget = os.path.getsize(targets[-1])
+    os.utime(targets[0], (0, 0))
+    os.utime(targets[1], (1, 1))
+    assert cache.trim() == 2
+    assert [os.path.exists(target) for target in targets] == [False, False, True]
@@ -0,0 +1,41 @@
+from toasted.toasted import NotifierPool, RecordingBackend, Toast
+
+
+class Clock:
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_notifiers_are_reused_per_app_and_user():
+    made = list()
+    pool = NotifierPool(lambda app_id, user: made.append((app_id, user)) or object())
+    first = pool.get("app")
+    assert pool.get("app") is first
+    assert pool.get("app", "user") is not first
+    assert pool.get("other") is not first
+    assert made == [("app", None), ("app", "user"), ("other", None)]
+    assert pool.stats() == {"size": 3, "hits": 1, "misses": 3, "evictions": 0}
+
+
+def test_idle_notifiers_are_evicted():
+    clock = Clock()
+    pool = NotifierPool(lambda app_id, user: object(), idle=10, clock=clock)
+    idle, busy = pool.get("idle"), pool.get("busy")
+    clock.now = 6
+    assert pool.get("busy") is busy
+    clock.now = 12
+    assert pool.get("busy") is busy
+    assert len(pool) == 1 and pool.stats()["evictions"] == 1
+    assert pool.get("idle") is not idle
+
+
+def test_sends_share_the_backend_notifier():
+    backend = RecordingBackend()
+    for _ in range(3):
+        Toast(backend=backend).send()
+    assert len(backend.shown) == 3
+    assert backend.notifiers.stats()["misses"] == 1
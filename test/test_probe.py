@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from toasted.toasted import Probe, RecordingBackend, Toast
+
+
+@pytest.fixture
+def probe(monkeypatch):
+    probe = Probe()
+    monkeypatch.setattr(Toast, "probe", probe)
+    return probe
+
+
+def test_sending_records_every_stage(probe):
+    laps = list()
+    probe.subscribe(lambda stage, seconds, toast: laps.append((stage, toast)))
+    toast = Toast.Reminder()
+    toast.backend = RecordingBackend()
+    toast.send()
+    stats = probe.stats()
+    for stage in ("build", "serialize", "validate", "load_xml", "notification", "notifier", "show", "send"):
+        assert stats[stage]["count"] >= 1, stage
+    assert ("send", toast) in laps
+    toast.send()
+    # the cached document is neither serialized nor loaded again
+    assert probe.stats()["send"]["count"] == 2 and probe.stats()["load_xml"]["count"] == 1
+
+
+def test_quantiles_are_bucket_bounds():
+    probe = Probe(buckets=(0.001, 0.01))
+    for seconds in (0.0005, 0.0005, 0.005, 0.5):
+        probe.record("send", seconds)
+    assert probe.quantile("send", 0.5) == 0.001
+    assert probe.quantile("send", 0.75) == 0.01
+    assert probe.quantile("send", 1.0) == float("inf")
+    assert probe.quantile("show", 0.5) is None
+
+
+def test_prometheus_histograms(tmp_path):
+    probe = Probe(buckets=(0.001, 0.01))
+    probe.record("send", 0.0005)
+    probe.record("send", 0.005)
+    text = probe.prometheus()
+    assert "# TYPE toasted_stage_seconds histogram" in text
+    assert 'toasted_stage_seconds_bucket{stage="send",le="0.001"} 1' in text
+    assert 'toasted_stage_seconds_bucket{stage="send",le="0.01"} 2' in text
+    assert 'toasted_stage_seconds_bucket{stage="send",le="+Inf"} 2' in text
+    assert 'toasted_stage_seconds_count{stage="send"} 2' in text
+    assert 'toasted_stage_seconds_count{stage="show"} 0' in text
+    path = tmp_path / "toasted.prom"
+    probe.export(str(path))
+    assert path.read_text(encoding="utf-8") == text
+    assert os.listdir(tmp_path) == ["toasted.prom"]
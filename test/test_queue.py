@@ -0,0 +1,21 @@
+from toasted.toasted import RecordingBackend, SendQueue, Toast
+
+
+class Broken(Toast):
+
+    def send(self):
+        raise RuntimeError("no notifier")
+
+
+def test_failed_sends_are_not_counted_as_sent():
+    backend = RecordingBackend()
+    queue = SendQueue(rate=1000, burst=1000)
+    for kind in (Toast, Broken, Toast, Broken, Broken):
+        queue.put(kind(backend=backend))
+    queue.start()
+    queue.join()
+    queue.stop()
+    stats = queue.stats()
+    assert (stats["sent"], stats["errors"]) == (2, 3)
+    assert len(backend.shown) == 2
+    assert stats["wait_mean"] <= stats["wait_max"]
@@ -0,0 +1,57 @@
+from toasted.toasted import RecordingBackend, Scheduler, Toast
+
+
+class Clock:
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def toast(backend, tag: str = "", group: str = "") -> Toast:
+    toast = Toast(backend=backend)
+    toast.tag, toast.group = tag, group
+    return toast
+
+
+def test_due_toasts_are_sent_in_order_on_the_fake_clock():
+    backend, clock = RecordingBackend(), Clock()
+    scheduler = Scheduler(clock)
+    late, early = toast(backend, "late"), toast(backend, "early")
+    scheduler.add(late, clock.now + 20)
+    scheduler.add(early, clock.now + 10)
+    assert scheduler.run_pending() == 0
+    clock.now += 15
+    assert scheduler.run_pending() == 1
+    clock.now += 10
+    assert scheduler.run_pending() == 1
+    assert [n.tag for n in backend.shown] == ["early", "late"]
+    assert len(scheduler) == 0 and scheduler._index == {}
+
+
+def test_cancel_by_tag_and_group():
+    backend, clock = RecordingBackend(), Clock()
+    scheduler = Scheduler(clock)
+    for tag, group in (("a", "x"), ("b", "x"), ("a", "y"), ("c", "")):
+        scheduler.add(toast(backend, tag, group), clock.now + 1)
+    assert scheduler.cancel(tag="a", group="x") == 1
+    assert scheduler.cancel(group="x") == 1
+    assert scheduler.cancel(tag="a") == 1
+    assert len(scheduler) == 1
+    clock.now += 1
+    assert scheduler.run_pending() == 1
+    assert [n.tag for n in backend.shown] == ["c"]
+
+
+def test_draining_many_toasts_sharing_a_key():
+    backend, clock = RecordingBackend(), Clock()
+    scheduler = Scheduler(clock)
+    base = toast(backend)
+    for offset in range(20000, 0, -1):
+        scheduler.add(base, clock.now + offset)
+    clock.now += 20000
+    with scheduler._condition:
+        assert len(scheduler._pop_due(clock())) == 20000
+    assert len(scheduler) == 0 and scheduler._index == {}
@@ -0,0 +1,33 @@
+import pytest
+
+from toasted.toasted import Schema, Toast, ValidationError
+
+
+def test_personalized_toasts_share_the_cache_entry():
+    schema = Schema()
+    for number in range(10):
+        toast = Toast.Reminder(title=f"Reminder {number}", subject=f"Task {number}")
+        toast.timestamp(f"2024-06-25 11:02:{number:02}")
+        schema.check(toast.xml.root)
+    assert len(schema._cache) == 1
+
+
+def test_checked_values_are_part_of_the_key():
+    schema = Schema()
+    toast = Toast.Reminder()
+    schema.check(toast.xml.root)
+    toast.binding[0].set("hint-style", "huge")
+    with pytest.raises(ValidationError, match="hint-style"):
+        schema.check(toast.xml.root)
+    toast.binding[0].set("hint-style", "body")
+    schema.check(toast.xml.root)
+
+
+def test_references_are_part_of_the_key():
+    schema = Schema()
+    toast = Toast.Reminder()
+    schema.check(toast.xml.root)
+    button = next(node for node in toast.buttons if node.get("hint-inputId"))
+    button.set("hint-inputId", "missing")
+    with pytest.raises(ValidationError, match="points to no input"):
+        schema.check(toast.xml.root)
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+from toasted.toasted import RecordingBackend, Store, Toast
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def test_import_leaves_the_optional_modules_out():
+    code = "import sys, toasted.toasted; print(*sorted({'sqlite3', 'json', 'asyncio', 'concurrent.futures', 'pathlib', 'hashlib', 'tempfile'} & set(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         env={**os.environ, "PYTHONPATH": SRC}, check=True).stdout
+    assert out.strip() == ""
+
+
+def test_records_sends_and_answers(monkeypatch):
+    store = Store()
+    monkeypatch.setattr(Toast, "store", store)
+    backend = RecordingBackend()
+    toast = Toast.Reminder()
+    toast.backend = backend
+    toast.send()
+    backend.activate(arguments="snooze", snoozeTime="5")
+    [record] = store.query()
+    assert record["response"] == "activated" and record["inputs"] == {"snoozeTime": "5"}
+    assert store.xml(record["id"]) == backend.shown[-1].content.get_xml()
+    store.close()
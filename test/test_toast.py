@@ -0,0 +1,114 @@
+import asyncio
+from xml.etree import ElementTree as xe
+
+from toasted.toasted import RecordingBackend, Toast
+
+
+def sent(backend: RecordingBackend) -> str:
+    return backend.shown[-1].content.get_xml()
+
+
+def reminder() -> tuple[Toast, RecordingBackend]:
+    backend = RecordingBackend()
+    toast = Toast.Reminder()
+    toast.backend = backend
+    toast.send()
+    return toast, backend
+
+
+def test_send_after_subelement():
+    toast, backend = reminder()
+    binding = toast.binding
+    xe.SubElement(binding, "text").text = "added"
+    binding.touch()
+    toast.send()
+    assert "added" in sent(backend)
+
+
+def test_reading_the_tree_keeps_the_cached_document(monkeypatch):
+    toast, backend = reminder()
+    toast.buttons, toast.inputboxes, toast.visual, toast.binding, toast.xml
+
+    def tostring(*args, **kwargs):
+        raise AssertionError("serialized again")
+
+    monkeypatch.setattr(xe, "tostring", tostring)
+    toast.send()
+    assert backend.shown[-1].content is backend.shown[0].content
+
+
+def test_send_after_attrib_edit():
+    toast, backend = reminder()
+    toast.binding.attrib["lang"] = "it"
+    toast.send()
+    assert 'lang="it"' in sent(backend)
+
+
+def test_send_after_held_attrib_edit():
+    toast, backend = reminder()
+    attrib = toast.binding.attrib
+    toast.send()
+    attrib.update(lang="it")
+    toast.send()
+    assert 'lang="it"' in sent(backend)
+    del attrib["lang"]
+    toast.send()
+    assert "lang" not in sent(backend)
+
+
+def test_send_after_held_node_edit():
+    toast, backend = reminder()
+    text = toast.binding[0]
+    toast.send()
+    text.text = "changed"
+    toast.send()
+    assert "changed" in sent(backend)
+
+
+def test_unchanged_document_is_loaded_once():
+    toast, backend = reminder()
+    toast.binding
+    toast.send()
+    toast.send()
+    assert backend.shown[-1].content is backend.shown[0].content
+
+
+def test_send_async_timeout():
+    toast, backend = reminder()
+    try:
+        asyncio.run(toast.send_async(timeout=0.01))
+    except TimeoutError as error:
+        assert "no response" in str(error)
+    else:
+        raise AssertionError("no timeout")
+
+
+def test_send_async_response():
+    toast, backend = reminder()
+
+    async def answer():
+        waiting = asyncio.ensure_future(toast.send_async(timeout=1))
+        await asyncio.sleep(0.01)
+        backend.activate(arguments="snooze")
+        return await waiting
+
+    assert asyncio.run(answer()).arguments == "snooze"
+
+
+def test_str_leaves_the_tree_unchanged():
+    toast = Toast.Reminder()
+    before = repr(toast)
+    revision = toast.xml.revision
+    string = str(toast)
+    assert repr(toast) == before
+    assert toast.xml.revision == revision
+    assert "useButtonStyle" not in toast.xml.root.attrib
+    assert 'useButtonStyle="true"' in string and 'useButtonStyle="true"' in before
+
+
+def test_incoming_call_drops_the_button_style():
+    toast = Toast.IncomingCall()
+    toast.xml.root.set("useButtonStyle", "true")
+    assert "useButtonStyle" not in str(toast)
+    assert "useButtonStyle" not in repr(toast)
+    assert toast.xml.root.get("useButtonStyle") == "true"
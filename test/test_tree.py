@@ -0,0 +1,89 @@
+from toasted.toasted import Element, Toast, Tree
+
+
+def test_clone_edits_stay_in_the_clone():
+    base = Toast.Reminder()
+    before = str(base)
+    clone = base.clone()
+    clone.binding[0].text = "changed"
+    clone.xml.root[0][0].set("template", "other")
+    for node in clone.xml.iter("text"):
+        node.text = "again"
+    assert str(base) == before
+    assert clone.binding[0].text == "again"
+
+
+def test_clone_keeps_the_source_nodes():
+    base = Toast.Reminder()
+    binding = base.binding
+    base.clone()
+    binding[0].text = "changed"
+    assert base.binding is binding
+    assert base.binding[0].text == "changed"
+
+
+def test_index_ignores_other_trees():
+    toast = Toast.Reminder()
+    other = Toast.Reminder()
+    toast.xml.byid("snoozeTime")
+    index = toast.xml._index
+    Element("text")
+    other.binding[0].text = "changed"
+    other.binding.append(Element("text"))
+    assert toast.xml.byid("snoozeTime") is not None
+    assert toast.xml._index is index
+
+
+def test_index_follows_edits():
+    tree = Tree("<toast><visual><binding><text id='1' /></binding></visual></toast>")
+    binding = tree.find("visual/binding")
+    assert tree.byid("1") is binding[0]
+    binding[0].set("id", "2")
+    assert tree.byid("1") is None and tree.byid("2") is binding[0]
+    binding.append(Toast.Text("new", id="3"))
+    assert tree.byid("3") is binding[1]
+    assert len(tree.bytag("text")) == 2
+    binding[1].attrib["id"] = "4"
+    assert tree.byid("4") is binding[1]
+    del binding[0]
+    assert tree.byid("2") is None and tree.bytag("text") == [binding[0]]
+
+
+def test_moved_nodes_count_in_the_new_tree():
+    first = Tree("<toast><text /></toast>")
+    second = Tree("<toast />")
+    node = first.root[0]
+    first.root.remove(node)
+    second.root.append(node)
+    revision = second.revision
+    node.set("id", "moved")
+    assert second.revision > revision
+    assert second.byid("moved") is node
+
+
+def test_copies_keep_the_actions_order():
+    base = Toast.Reminder()
+    clone = base.clone()
+    actions = clone.actions
+    assert type(actions) is type(base.actions) and actions.inputs == base.actions.inputs
+    actions.append(Toast.InputBox("reply"))
+    assert [node.tag for node in actions][:actions.inputs] == ["input"] * actions.inputs
+    assert actions.inputs == base.actions.inputs + 1
+    assert len(clone.xml.bytag("input")) == len(base.xml.bytag("input")) + 1
+
+
+def test_index_survives_text_edits():
+    toast = Toast.Reminder()
+    tree = toast.xml
+    tree.byid("snoozeTime")
+    index = tree._index
+    revision = tree.revision
+    toast.binding[0].text = "changed"
+    toast.xml.root.set("displayTimestamp", Toast.isotime())
+    toast.binding[0].attrib["hint-maxLines"] = "2"
+    assert tree.revision > revision
+    assert tree._index is index and tree.byid("snoozeTime") is not None
+    del tree.byid("snoozeTime").attrib["id"]
+    assert tree.byid("snoozeTime") is None
+    toast.actions[:] = []
+    assert tree.bytag("action") == []
@@ -0,0 +1,55 @@
+import time
+
+from toasted.toasted import RecordingBackend, Toast, Updater
+
+
+def progress(tag: str = "copy", backend: RecordingBackend = None) -> tuple[Toast, RecordingBackend]:
+    backend = RecordingBackend() if backend is None else backend
+    toast = Toast(backend=backend)
+    toast.tag = tag
+    toast.send()
+    return toast, backend
+
+
+def values(backend: RecordingBackend) -> list[dict]:
+    return [dict(data.values) for _, data, _, _ in backend.updates]
+
+
+def test_updates_within_the_interval_are_coalesced():
+    toast, backend = progress()
+    updater = Updater(rate=20)
+    assert updater.submit(toast, progressValue="0.1")
+    assert not updater.submit(toast, progressValue="0.2", progressStatus="copying")
+    assert not updater.submit(toast, progressValue="0.3")
+    assert values(backend) == [{"progressValue": "0.1"}]
+    # the timer thread sends the merged values once the interval is over
+    deadline = time.monotonic() + 2
+    while updater.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert values(backend)[-1] == {"progressValue": "0.3", "progressStatus": "copying"}
+    assert updater.stats() == {"submitted": 3, "sent": 2, "pending": 0}
+    assert backend.shown[-1].data.sequence_number == 2
+
+
+def test_flush_sends_the_pending_values_now():
+    first, backend = progress("first")
+    updater = Updater(rate=0.1)
+    updater.submit(first, progressValue="0.1")
+    updater.submit(first, progressValue="0.5")
+    assert updater._timers
+    updater.flush()
+    assert not updater._timers and updater.stats()["pending"] == 0
+    assert values(backend)[-1]["progressValue"] == "0.5"
+
+
+def test_tags_are_limited_apart():
+    first, backend = progress("first")
+    second, _ = progress("second", backend)
+    updater = Updater(rate=0.1)
+    assert updater.submit(first, progressValue="0.1")
+    assert updater.submit(second, progressValue="0.1")
+    assert not updater.submit(first, progressValue="0.2")
+    updater.flush()
+    assert [(tag, dict(data.values)) for _, data, tag, _ in backend.updates] == [
+        ("first", {"progressValue": "0.1"}), ("second", {"progressValue": "0.1"}),
+        ("first", {"progressValue": "0.2"})]